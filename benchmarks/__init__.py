@@ -0,0 +1,11 @@
+from .generate import generate_cxr, generate_iv
+from .runner import compare, run
+from .server import serve
+
+__all__ = (
+    "compare",
+    "generate_cxr",
+    "generate_iv",
+    "run",
+    "serve",
+)
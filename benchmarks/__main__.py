@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+from .runner import compare, load_baseline, run, save_baseline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--datasets", nargs="+", default=["iv", "cxr"])
+    parser.add_argument("--subjects", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--image-size", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--work-dir", default=None)
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(
+        args.datasets,
+        n_subjects=args.subjects,
+        seed=args.seed,
+        image_size=args.image_size,
+        batch_size=args.batch_size,
+        n_batches=args.batches,
+        work_dir=args.work_dir,
+    )
+
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+
+    for regression in regressions:
+        sys.stderr.write(f"Regression: {regression}\n")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
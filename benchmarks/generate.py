@@ -0,0 +1,209 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+CXR_LABELS = [
+    "Atelectasis",
+    "Cardiomegaly",
+    "Consolidation",
+    "Edema",
+    "Enlarged Cardiomediastinum",
+    "Fracture",
+    "Lung Lesion",
+    "Lung Opacity",
+    "Pleural Effusion",
+    "Pneumonia",
+    "Pneumothorax",
+    "Pleural Other",
+    "Support Devices",
+    "No Finding",
+]
+
+_BASE_TIME = np.datetime64("2150-01-01T00:00:00")
+
+
+def _write(df: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False, compression="gzip")
+
+
+def _times(rng: np.random.Generator, base: np.ndarray, hours: float) -> np.ndarray:
+    offsets = rng.uniform(0, hours * 3600, len(base)).astype("timedelta64[s]")
+    return base + offsets
+
+
+def _jpeg_pool(rng: np.random.Generator, image_size: int, pool_size: int) -> list[bytes]:
+    pool = []
+
+    for _ in range(pool_size):
+        pixels = rng.integers(0, 256, (image_size, image_size), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels, mode="L").save(buffer, format="JPEG", quality=90)
+        pool.append(buffer.getvalue())
+
+    return pool
+
+
+def generate_iv(root: str | Path, n_subjects: int = 1000, seed: int = 0) -> Path:
+    rng = np.random.default_rng(seed)
+    root = Path(root) / "iv"
+
+    subject_id = np.arange(10_000_000, 10_000_000 + n_subjects)
+    patients = pd.DataFrame(
+        {
+            "subject_id": subject_id,
+            "gender": rng.choice(["F", "M"], n_subjects),
+            "anchor_age": rng.integers(18, 91, n_subjects),
+            "anchor_year": rng.integers(2110, 2190, n_subjects),
+            "dod": None,
+        }
+    )
+
+    n_admissions = n_subjects * 2
+    hadm_id = np.arange(20_000_000, 20_000_000 + n_admissions)
+    admittime = _times(rng, np.full(n_admissions, _BASE_TIME), 24 * 365 * 10)
+    admissions = pd.DataFrame(
+        {
+            "subject_id": rng.choice(subject_id, n_admissions),
+            "hadm_id": hadm_id,
+            "admittime": admittime,
+            "dischtime": _times(rng, admittime, 24 * 14),
+            "admission_type": rng.choice(["EW EMER.", "ELECTIVE", "URGENT"], n_admissions),
+            "insurance": rng.choice(["Medicare", "Medicaid", "Other"], n_admissions),
+            "hospital_expire_flag": rng.binomial(1, 0.05, n_admissions),
+        }
+    )
+
+    n_labs = n_admissions * 50
+    lab_admission = rng.integers(0, n_admissions, n_labs)
+    labevents = pd.DataFrame(
+        {
+            "labevent_id": np.arange(n_labs),
+            "subject_id": admissions["subject_id"].to_numpy()[lab_admission],
+            "hadm_id": hadm_id[lab_admission],
+            "itemid": rng.choice([50912, 50971, 50983, 51221, 51301], n_labs),
+            "charttime": _times(rng, admittime[lab_admission], 24 * 7),
+            "valuenum": rng.normal(5, 2, n_labs).round(2),
+            "valueuom": "mg/dL",
+            "flag": rng.choice(["abnormal", None], n_labs, p=[0.2, 0.8]),
+        }
+    )
+
+    diagnoses = pd.DataFrame(
+        {
+            "subject_id": admissions["subject_id"].repeat(5).to_numpy(),
+            "hadm_id": hadm_id.repeat(5),
+            "seq_num": np.tile(np.arange(1, 6), n_admissions),
+            "icd_code": rng.choice(
+                ["I10", "E119", "N179", "J189", "A419"], n_admissions * 5
+            ),
+            "icd_version": 10,
+        }
+    )
+
+    n_stays = n_admissions // 2
+    stay_admission = rng.choice(n_admissions, n_stays, replace=False)
+    intime = _times(rng, admittime[stay_admission], 24)
+    icustays = pd.DataFrame(
+        {
+            "subject_id": admissions["subject_id"].to_numpy()[stay_admission],
+            "hadm_id": hadm_id[stay_admission],
+            "stay_id": np.arange(30_000_000, 30_000_000 + n_stays),
+            "first_careunit": rng.choice(["MICU", "SICU", "CCU"], n_stays),
+            "intime": intime,
+            "outtime": _times(rng, intime, 24 * 5),
+            "los": rng.gamma(2, 1.5, n_stays).round(3),
+        }
+    )
+
+    n_charts = n_stays * 100
+    chart_stay = rng.integers(0, n_stays, n_charts)
+    chartevents = pd.DataFrame(
+        {
+            "subject_id": icustays["subject_id"].to_numpy()[chart_stay],
+            "hadm_id": icustays["hadm_id"].to_numpy()[chart_stay],
+            "stay_id": icustays["stay_id"].to_numpy()[chart_stay],
+            "charttime": _times(rng, intime[chart_stay], 24 * 5),
+            "itemid": rng.choice([220045, 220179, 220180, 220210, 223761], n_charts),
+            "valuenum": rng.normal(80, 15, n_charts).round(1),
+            "valueuom": "bpm",
+        }
+    )
+
+    _write(patients, root / "hosp" / "patients.csv.gz")
+    _write(admissions, root / "hosp" / "admissions.csv.gz")
+    _write(labevents, root / "hosp" / "labevents.csv.gz")
+    _write(diagnoses, root / "hosp" / "diagnoses_icd.csv.gz")
+    _write(icustays, root / "icu" / "icustays.csv.gz")
+    _write(chartevents, root / "icu" / "chartevents.csv.gz")
+
+    return root
+
+
+def generate_cxr(
+    root: str | Path,
+    n_subjects: int = 1000,
+    seed: int = 0,
+    image_size: int = 256,
+    pool_size: int = 16,
+) -> Path:
+    rng = np.random.default_rng(seed)
+    root = Path(root) / "cxr"
+
+    n_studies = n_subjects * 2
+    subject_id = rng.choice(np.arange(10_000_000, 10_000_000 + n_subjects), n_studies)
+    study_id = np.arange(50_000_000, 50_000_000 + n_studies)
+
+    labels = rng.choice([1.0, 0.0, -1.0, np.nan], (n_studies, len(CXR_LABELS)))
+    study = pd.DataFrame(labels, columns=CXR_LABELS)
+    study.insert(0, "study_id", study_id)
+    study.insert(0, "subject_id", subject_id)
+
+    images_per_study = rng.integers(1, 3, n_studies)
+    n_images = int(images_per_study.sum())
+    dicom_id = [
+        "-".join(f"{v:08x}" for v in row)
+        for row in rng.integers(0, 2**32, (n_images, 5), dtype=np.uint64)
+    ]
+
+    split = pd.DataFrame(
+        {
+            "dicom_id": dicom_id,
+            "study_id": study_id.repeat(images_per_study),
+            "subject_id": subject_id.repeat(images_per_study),
+            "split": rng.choice(
+                ["train", "validate", "test"], n_images, p=[0.9, 0.05, 0.05]
+            ),
+        }
+    )
+
+    metadata = split[["dicom_id", "subject_id", "study_id"]].copy()
+    metadata["ViewPosition"] = rng.choice(["PA", "AP", "LATERAL"], n_images)
+    metadata["Rows"] = image_size
+    metadata["Columns"] = image_size
+    metadata["PatientOrientationCodeSequence_CodeMeaning"] = "Erect"
+
+    _write(split, root / "mimic-cxr-2.0.0-split.csv.gz")
+    _write(study, root / "mimic-cxr-2.0.0-chexpert.csv.gz")
+    _write(study, root / "mimic-cxr-2.0.0-negbio.csv.gz")
+    _write(metadata, root / "mimic-cxr-2.0.0-metadata.csv.gz")
+
+    pool = _jpeg_pool(rng, image_size, pool_size)
+
+    for i, row in enumerate(split.itertuples(index=False)):
+        subject = str(row.subject_id)
+        path = (
+            root
+            / "files"
+            / f"p{subject[:2]}"
+            / f"p{subject}"
+            / f"s{row.study_id}"
+            / f"{row.dicom_id}.jpg"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(pool[i % pool_size])
+
+    return root
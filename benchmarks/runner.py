@@ -0,0 +1,249 @@
+import json
+import os
+import resource
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from torchvision import transforms
+
+from mimic.datasets import CXR, IV, BaseDataset
+from mimic.utils.db import DuckDB
+from mimic.utils.env import Env
+from mimic.utils.sheet import Sheet, SheetJoinCondition
+
+from .generate import CXR_LABELS, generate_cxr, generate_iv
+from .server import serve
+
+CREDENTIALS = {"username": "benchmark", "password": "benchmark"}
+
+HIGHER_IS_BETTER = {"batches_per_s"}
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _throughput(
+    collate_fn: Callable[[list[int]], Any],
+    length: int,
+    batch_size: int,
+    n_batches: int,
+    seed: int,
+) -> float:
+    rng = np.random.default_rng(seed)
+    batches = [
+        rng.choice(length, min(batch_size, length), replace=False).tolist()
+        for _ in range(n_batches)
+    ]
+
+    start = time.perf_counter()
+
+    for batch in batches:
+        collate_fn(batch)
+
+    return n_batches / (time.perf_counter() - start)
+
+
+def _iv(root: Path) -> IV:
+    env = Env()
+    raw = IV.get_raw_folder(root)
+    db = DuckDB(root=raw, db_name="benchmark.db")
+
+    def sheet(name: str, columns: dict[str, str], id_column: str) -> Sheet:
+        return Sheet(
+            root=raw,
+            db=db,
+            columns=columns,
+            id_column=id_column,
+            table_name=name,
+            file_name=env.iv_files[name]["name"],
+            skip_unchanged=True,
+        )
+
+    sheets = {
+        "admissions": sheet(
+            "admissions",
+            {"subject_id": "string", "hadm_id": "string", "hospital_expire_flag": "int"},
+            "hadm_id",
+        ),
+        "patients": sheet(
+            "patients",
+            {"subject_id": "string", "gender": "string", "anchor_age": "int"},
+            "subject_id",
+        ),
+        "labevents": sheet(
+            "labevents",
+            {
+                "hadm_id": "string",
+                "itemid": "int",
+                "charttime": "string",
+                "valuenum": "float",
+            },
+            "hadm_id",
+        ),
+        "chartevents": sheet(
+            "chartevents",
+            {
+                "stay_id": "string",
+                "itemid": "int",
+                "charttime": "string",
+                "valuenum": "float",
+            },
+            "stay_id",
+        ),
+    }
+
+    return IV(
+        root=root,
+        db=db,
+        column_id="hadm_id",
+        columns=["anchor_age", "hospital_expire_flag"],
+        sheets=sheets,
+        join_conditions=[
+            SheetJoinCondition(
+                l_sheet=sheets["admissions"],
+                r_sheet=sheets["patients"],
+                columns=("subject_id", "subject_id"),
+                mode="left",
+            )
+        ],
+        download=True,
+    )
+
+
+def _cxr(root: Path) -> CXR:
+    db = DuckDB(root=CXR.get_raw_folder(root), db_name="benchmark.db")
+
+    return CXR(
+        root=root,
+        db=db,
+        columns=CXR_LABELS[:4],
+        label_proportions=dict.fromkeys(CXR_LABELS[:4], 0.5),
+        transform=transforms.Compose(
+            [transforms.Resize((224, 224)), transforms.ToTensor()]
+        ),
+        download=True,
+        skip_unchanged=True,
+    )
+
+
+_DATASETS: dict[str, Callable[[Path], BaseDataset]] = {"iv": _iv, "cxr": _cxr}
+
+
+def _run_dataset(
+    name: str,
+    root: str,
+    base_url: str,
+    *,
+    batch_size: int,
+    n_batches: int,
+    seed: int,
+) -> dict[str, float]:
+    os.environ["IV_URL"] = f"{base_url}/iv"
+    os.environ["CXR_URL"] = f"{base_url}/cxr"
+    os.environ["USERNAME"] = CREDENTIALS["username"]
+    os.environ["PASSWORD"] = CREDENTIALS["password"]
+
+    build = _DATASETS[name]
+
+    start = time.perf_counter()
+    dataset = build(Path(root))
+    ingest = time.perf_counter() - start
+    dataset.db.close()
+
+    start = time.perf_counter()
+    dataset = build(Path(root))
+    startup = time.perf_counter() - start
+
+    throughput = _throughput(dataset.collate_fn, len(dataset), batch_size, n_batches, seed)
+
+    return {
+        "ingest_s": round(ingest, 3),
+        "startup_s": round(startup, 3),
+        "batches_per_s": round(throughput, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run(
+    datasets: list[str],
+    *,
+    n_subjects: int = 1000,
+    seed: int = 0,
+    image_size: int = 256,
+    batch_size: int = 32,
+    n_batches: int = 50,
+    work_dir: str | Path | None = None,
+) -> dict[str, dict[str, float]]:
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        mirror = Path(tmp) / "physionet"
+
+        if "iv" in datasets:
+            generate_iv(mirror, n_subjects, seed)
+
+        if "cxr" in datasets:
+            generate_cxr(mirror, n_subjects, seed, image_size)
+
+        results = {}
+        context = get_context("spawn")
+
+        with serve(mirror, CREDENTIALS) as base_url:
+            for name in datasets:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    results[name] = executor.submit(
+                        _run_dataset,
+                        name,
+                        str(Path(tmp) / "data" / name),
+                        base_url,
+                        batch_size=batch_size,
+                        n_batches=n_batches,
+                        seed=seed,
+                    ).result()
+
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float = 0.2,
+) -> list[str]:
+    regressions = []
+
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+
+            if not reference:
+                continue
+
+            change = (value - reference) / reference
+
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+
+            if change > tolerance:
+                regressions.append(
+                    f"{name}.{metric}: {value} vs baseline {reference} ({change:+.0%})"
+                )
+
+    return regressions
+
+
+def load_baseline(path: str | Path) -> dict[str, dict[str, float]]:
+    path = Path(path)
+
+    if not path.exists():
+        return {}
+
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: str | Path, results: dict[str, dict[str, float]]) -> None:
+    Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
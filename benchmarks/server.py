@@ -0,0 +1,94 @@
+import base64
+import re
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class PhysioNetHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args: Any, authorization: str, **kwargs: Any) -> None:
+        self.authorization = authorization
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _authorized(self) -> bool:
+        if self.headers.get("Authorization") == self.authorization:
+            return True
+
+        self.send_response(HTTPStatus.UNAUTHORIZED)
+        self.send_header("WWW-Authenticate", 'Basic realm="PhysioNet"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+        return False
+
+    def do_HEAD(self) -> None:
+        if self._authorized():
+            super().do_HEAD()
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+
+        match = _RANGE.match(self.headers.get("Range", ""))
+        path = Path(self.translate_path(self.path))
+
+        if match is None or not path.is_file():
+            super().do_GET()
+            return
+
+        size = path.stat().st_size
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else size - 1
+
+        if start >= size:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        end = min(end, size - 1)
+
+        with path.open("rb") as fh:
+            fh.seek(start)
+            data = fh.read(end - start + 1)
+
+        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+        self.send_header("Content-Type", self.guess_type(str(path)))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@contextmanager
+def serve(directory: str | Path, credentials: dict[str, str]) -> Iterator[str]:
+    token = base64.b64encode(
+        f"{credentials['username']}:{credentials['password']}".encode()
+    ).decode()
+    handler = partial(
+        PhysioNetHandler,
+        directory=str(directory),
+        authorization=f"Basic {token}",
+    )
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -1,9 +1,12 @@
 from .base import BaseDataset
-from .cxr import CXR
-from .iv import IV
+from .cxr import CXR, CXRShards
+from .iv import IV, IVStream, IVTimeSeries
 
 __all__ = (
     "CXR",
     "IV",
     "BaseDataset",
+    "CXRShards",
+    "IVStream",
+    "IVTimeSeries",
 )
@@ -1,20 +1,76 @@
+import hashlib
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import Dataset
-from torchvision.datasets.utils import check_integrity
+import torch.distributed as dist
+from torch.utils.data import Dataset, get_worker_info
 from tqdm import tqdm
 
-from mimic.utils import download_and_extract_archive
+from mimic.utils import download_and_extract_archives
 from mimic.utils.db import DuckDB
 from mimic.utils.env import Env
+from mimic.utils.metrics import Metrics
 from mimic.utils.sheet import Sheet, SheetJoinCondition, SheetQuery
 
 
+def _numeric_array(name: str, array: np.ndarray) -> np.ndarray:
+    if isinstance(array, np.ma.MaskedArray):
+        if not np.ma.getmaskarray(array).any():
+            array = np.ma.getdata(array)
+        else:
+            array = np.ma.filled(array.astype(np.float64), np.nan)
+
+    if array.dtype.kind not in "biuf":
+        msg = f"Column '{name}' is not numeric and can not be converted to a tensor."
+        raise TypeError(msg)
+
+    return array
+
+
+def to_tensor(
+    arrays: dict[str, np.ndarray],
+    *,
+    as_dict: bool = False,
+) -> torch.Tensor | dict[str, torch.Tensor]:
+    arrays = {name: _numeric_array(name, arr) for name, arr in arrays.items()}
+
+    if as_dict:
+        return {
+            name: torch.from_numpy(np.ascontiguousarray(arr))
+            for name, arr in arrays.items()
+        }
+
+    if len(arrays) == 0:
+        return torch.empty((0, 0), dtype=torch.float64)
+
+    return torch.from_numpy(np.stack(list(arrays.values()), axis=1))
+
+
+def rank_shard() -> tuple[int, int]:
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+
+    return 0, 1
+
+
+def worker_shard() -> tuple[int, int]:
+    rank, world_size = rank_shard()
+
+    worker_id, num_workers = 0, 1
+    info = get_worker_info()
+
+    if info is not None:
+        worker_id, num_workers = info.id, info.num_workers
+
+    return rank * num_workers + worker_id, world_size * num_workers
+
+
 class BaseDataset(Dataset, ABC):
     def __init__(
         self,
@@ -27,6 +83,12 @@ class BaseDataset(Dataset, ABC):
         *,
         download: bool = False,
         skip_load: bool = False,
+        materialize: bool = False,
+        as_dict: bool = False,
+        metrics: Metrics | None = None,
+        load_workers: int = 4,
+        archive_workers: int = 4,
+        extract_archives: bool = True,
     ) -> None:
         super().__init__()
 
@@ -39,10 +101,29 @@ class BaseDataset(Dataset, ABC):
         self.sheets = sheets
         self.join_conditions = join_conditions
         self.credentials = env.credentials
+        self.materialize = materialize
+        self.as_dict = as_dict
+        self.load_workers = load_workers
+        self.archive_workers = archive_workers
+        self.extract_archives = extract_archives
+        self.batch_table: str | None = None
+        self._length: tuple[tuple[int, str], int] | None = None
+        self.metrics = metrics or Metrics(enabled=False)
+
+        if metrics is not None:
+            self.db.set_metrics(metrics)
+
+            for sheet in self.sheets.values():
+                sheet.metrics = metrics
+
+        files = self._files()
 
         self.resources = []
         for k in self.sheets:
-            resource = self._files()[k]
+            if k not in files:
+                continue
+
+            resource = files[k]
             resource["download_root"] = self.sheets[k].root
             self.resources.append(resource)
 
@@ -61,15 +142,21 @@ class BaseDataset(Dataset, ABC):
 
         self._load_data()
 
+        if self.materialize:
+            self._materialize()
+
     @abstractmethod
     def _files(self) -> dict[str, dict[str, Any]]:
         pass
 
     def _check_exists(self) -> bool:
-        return all(
-            check_integrity(Path(f.get("download_root")) / Path(f.get("url")).stem)
-            for f in self.resources
-        )
+        return all(self._resource_exists(f) for f in self.resources)
+
+    @staticmethod
+    def _resource_exists(resource: dict[str, Any]) -> bool:
+        archive = Path(resource["download_root"]) / Path(resource["url"]).name
+
+        return archive.with_suffix("").exists() or archive.exists()
 
     @property
     def raw_folder(self) -> Path:
@@ -85,17 +172,77 @@ class BaseDataset(Dataset, ABC):
 
         self.raw_folder.mkdir(parents=True, exist_ok=True)
 
-        for f in self.resources:
-            download_and_extract_archive(
-                url=f.get("url"),
-                download_root=f.get("download_root"),
-                credentials=self.credentials,
-                md5=f.get("md5"),
-            )
+        download_and_extract_archives(
+            self.resources,
+            self.credentials,
+            max_workers=self.archive_workers,
+            extract=self.extract_archives,
+        )
 
     def _load_data(self) -> None:
-        for k in tqdm(self.sheets, desc="Loading data"):
-            self.sheets[k].load_csv()
+        self.db.exec(SheetQuery.create_fingerprint_table())
+
+        pending = dict(self.sheets)
+        members = {id(sheet) for sheet in self.sheets.values()}
+        loaded: set[int] = set()
+        errors: dict[str, str] = {}
+        cause: BaseException | None = None
+        futures: dict[Future, str] = {}
+
+        with (
+            ThreadPoolExecutor(max_workers=max(1, self.load_workers)) as executor,
+            tqdm(total=len(pending), desc="Loading data") as p_bar,
+        ):
+            while pending or futures:
+                ready = [
+                    k
+                    for k, sheet in pending.items()
+                    if all(
+                        id(dep) in loaded or id(dep) not in members
+                        for dep in sheet.dependencies
+                    )
+                ]
+
+                for k in ready:
+                    futures[executor.submit(pending.pop(k).load_csv)] = k
+
+                if not futures:
+                    break
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    k = futures.pop(future)
+                    error = future.exception()
+
+                    if error is None:
+                        loaded.add(id(self.sheets[k]))
+                    else:
+                        errors[k] = f"{type(error).__name__}: {error}"
+                        cause = cause or error
+
+                    p_bar.update(1)
+
+        for k in pending:
+            errors[k] = "skipped because a dependency failed to load"
+
+        if errors:
+            summary = "\n".join(f"  {k}: {error}" for k, error in errors.items())
+            msg = f"Failed to load {len(errors)} of {len(self.sheets)} sheets:\n{summary}"
+            raise RuntimeError(msg) from cause
+
+    def _materialize(self) -> None:
+        digest = hashlib.sha256(self.main_query.parse().encode()).hexdigest()[:16]
+        self.batch_table = f"{self.__class__.__name__.lower()}_batch_{digest}"
+
+        self.db.exec(SheetQuery.create_table_as(self.batch_table, self.main_query))
+        self.db.exec(SheetQuery.create_index(self.batch_table, "row_num"))
+
+    def _batch_query(self, idx: list[int]) -> SheetQuery:
+        if self.batch_table is None:
+            return self.main_query.find_by_row_id(idx, inplace=False)
+
+        return SheetQuery.from_table(self.batch_table).filter_row_id(idx)
 
     def _calc_query(
         self,
@@ -116,20 +263,66 @@ class BaseDataset(Dataset, ABC):
 
         return query
 
+    def _to_tensor(
+        self,
+        arrays: dict[str, np.ndarray],
+    ) -> torch.Tensor | dict[str, torch.Tensor]:
+        return to_tensor(arrays, as_dict=self.as_dict)
+
+    def _column_type(self, column: str) -> str | None:
+        table_name, _, name = column.rpartition(".")
+        tables = [sheet.table_name for sheet in self.sheets.values()]
+
+        if table_name:
+            tables = [table_name]
+
+        res = self.db.fetch_one(SheetQuery.column_type(tables, name))
+
+        return None if res is None else res[0]
+
     def get_by_id(self, ids: list[str]) -> pd.DataFrame:
-        query = self.main_query.find_by_id(self.column_id, ids, inplace=False)
+        query = self.main_query.find_by_id(
+            self.column_id,
+            ids,
+            column_type=self._column_type(self.column_id),
+            inplace=False,
+        )
 
         return self.db.fetch_df(query).drop(columns=["row_num"])
 
     def __len__(self) -> int:
-        res = self.db.fetch_one(self.count_query)
-        if res is None:
-            return 0
-        return res[0]
+        query = self.count_query
+
+        if self.batch_table is not None:
+            query = SheetQuery.from_table(self.batch_table, columns="COUNT(*)")
+
+        key = (self.db.version, query.parse())
+
+        if self._length is not None and self._length[0] == key:
+            return self._length[1]
+
+        res = self.db.fetch_one(query)
+        length = 0 if res is None else res[0]
+
+        self._length = (key, length)
+
+        return length
 
     def __getitem__(self, idx: int) -> int:
         return idx
 
+    @staticmethod
+    def worker_init_fn(worker_id: int) -> None:  # noqa: ARG004
+        info = get_worker_info()
+
+        if info is None or not isinstance(info.dataset, BaseDataset):
+            return
+
+        info.dataset.metrics.attach_worker()
+
     @abstractmethod
-    def collate_fn(self, idx: list[int]) -> Sequence[torch.Tensor] | torch.Tensor:
+    def collate_fn(
+        self,
+        idx: list[int],
+    ) -> Sequence[torch.Tensor | dict[str, torch.Tensor]] | torch.Tensor:
         pass
@@ -1,43 +1,95 @@
-from collections.abc import Callable
+import hashlib
+import io
+import json
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Literal
 
-import pandas as pd
+import numpy as np
 import torch
 from PIL import Image
+from torch.utils.data import IterableDataset
 from torchvision import transforms
 from tqdm import tqdm
 
-from mimic.utils import check_integrity, download_url
+from mimic.utils.cache import ImageCache
 from mimic.utils.db import DuckDB
+from mimic.utils.download import download_urls
 from mimic.utils.env import Env
+from mimic.utils.manifest import ImageManifest
+from mimic.utils.metrics import Metrics
+from mimic.utils.shards import ShardWriter, read_shard
 from mimic.utils.sheet import (
     Sheet,
     SheetJoinCondition,
     SheetQuery,
-    SheetSubset,
     SheetTransformCallable,
+    callable_identity,
 )
 
-from .base import BaseDataset
+from .base import BaseDataset, to_tensor, worker_shard
 
+_IMAGE_PATH_EXPRESSION = (
+    "'files/p' || subject_id[1:2] || '/p' || subject_id"
+    " || '/s' || study_id || '/' || dicom_id || '.jpg'"
+)
+
+
+_SHARD_KEYS = ("row_num", "dicom_id", "image_path")
 
-def _transform_split(db: DuckDB, df: pd.DataFrame) -> SheetSubset:  # noqa: ARG001
-    df["image_path"] = (
-        "files/p"
-        + df["subject_id"].str[:2]
-        + "/p"
-        + df["subject_id"]
-        + "/s"
-        + df["study_id"]
-        + "/"
-        + df["dicom_id"]
-        + ".jpg"
+
+def _default_transform() -> transforms.Compose:
+    return transforms.Compose(
+        [
+            transforms.Resize((1500, 1500)),
+            transforms.ToTensor(),
+        ]
     )
 
-    df["download"] = False
 
-    return SheetSubset(df)
+_CACHEABLE_TRANSFORMS = (
+    transforms.Resize,
+    transforms.CenterCrop,
+    transforms.Grayscale,
+)
+
+
+def _split_transform(
+    transform: Callable[[Any], torch.Tensor],
+) -> tuple[transforms.Compose, Callable[[Any], torch.Tensor]]:
+    if not isinstance(transform, transforms.Compose):
+        return transforms.Compose([]), transform
+
+    steps = transform.transforms
+    n = 0
+
+    while n < len(steps) and isinstance(steps[n], _CACHEABLE_TRANSFORMS):
+        n += 1
+
+    return transforms.Compose(steps[:n]), transforms.Compose(steps[n:])
+
+
+def _draft_size(transform: Callable[[Any], torch.Tensor]) -> tuple[int, int] | None:
+    if not isinstance(transform, transforms.Compose) or not transform.transforms:
+        return None
+
+    resize = transform.transforms[0]
+
+    if not isinstance(resize, transforms.Resize):
+        return None
+
+    size = resize.size
+
+    if isinstance(size, int):
+        return size, size
+
+    if len(size) == 1:
+        return size[0], size[0]
+
+    height, width = size
+
+    return width, height
 
 
 class CXR(BaseDataset):
@@ -59,6 +111,17 @@ class CXR(BaseDataset):
         download: bool = False,
         use_metadata: bool = False,
         skip_load: bool = False,
+        materialize: bool = False,
+        as_dict: bool = False,
+        cache_images: bool = False,
+        download_workers: int = 16,
+        check_workers: int = 32,
+        verify_images: bool = False,
+        seed: int = 0,
+        metrics: Metrics | None = None,
+        load_workers: int = 4,
+        archive_workers: int = 4,
+        extract_archives: bool = True,
         **kwargs,
     ) -> None:
         env = Env()
@@ -72,12 +135,20 @@ class CXR(BaseDataset):
         self.study_transform = study_transform
         self.study_table_fields = study_table_fields
         self.transform = transform or self._create_transform()
+        self.cache_transform, self.tensor_transform = _split_transform(self.transform)
+        self.draft_size = _draft_size(self.transform)
+        self.mode = mode
         self.use_metadata = use_metadata
         self.metadata_transform = metadata_transform
         self.metadata_table_fields = metadata_table_fields
         self.download_condition = download_condition
+        self.download_workers = download_workers
+        self.check_workers = check_workers
+        self.verify_images = verify_images
+        self.seed = seed
         self.kwargs = kwargs
         self.sheets = self._create_sheets(env.cxr_files)
+        self.image_cache = self._create_image_cache() if cache_images else None
 
         super().__init__(
             root=self.root,
@@ -88,13 +159,14 @@ class CXR(BaseDataset):
             join_conditions=self._create_join_conditions(),
             download=download,
             skip_load=skip_load,
+            materialize=materialize,
+            as_dict=as_dict,
+            metrics=metrics,
+            load_workers=load_workers,
+            archive_workers=archive_workers,
+            extract_archives=extract_archives,
         )
 
-        split_condition = f"split='{mode}'"
-
-        self.main_query.where(split_condition, inplace=True)
-        self.count_query.where(split_condition, inplace=True)
-
         if download:
             self._download_images()
 
@@ -106,12 +178,13 @@ class CXR(BaseDataset):
             raise RuntimeError(msg)
 
     def _create_transform(self) -> Callable[[Any], torch.Tensor]:
-        return transforms.Compose(
-            [
-                transforms.Resize((1500, 1500)),
-                transforms.ToTensor(),
-            ]
-        )
+        return _default_transform()
+
+    def _create_image_cache(self) -> ImageCache:
+        key = repr((self.cache_transform, self.draft_size))
+        fingerprint = hashlib.sha256(key.encode()).hexdigest()[:16]
+
+        return ImageCache(self.raw_folder / "cache", fingerprint)
 
     def _create_join_conditions(self) -> list[SheetJoinCondition]:
         join_conditions = [
@@ -150,12 +223,15 @@ class CXR(BaseDataset):
         return columns
 
     def _check_images_exists(self) -> bool:
-        files = self.db.fetch_df(self.main_query)["image_path"].to_list()
+        query = self._calc_query(columns="image_path")
+        files = self.db.fetch_numpy(query)["image_path"].tolist()
 
         if len(files) == 0:
             return False
 
-        return all(check_integrity(self.raw_folder / f) for f in files)
+        manifest = ImageManifest(self.db, self.raw_folder, max_workers=self.check_workers)
+
+        return manifest.check(files, verify=self.verify_images)
 
     def _calc_query(
         self,
@@ -163,6 +239,7 @@ class CXR(BaseDataset):
         *,
         only_count: bool = False,
         downloaded_only: bool = True,
+        split_only: bool = True,
     ) -> SheetQuery:
         query = super()._calc_query(columns, only_count=only_count)
 
@@ -170,6 +247,10 @@ class CXR(BaseDataset):
             download_condition = "download=True"
             query.where(download_condition, inplace=True)
 
+        if split_only:
+            split_condition = f"split='{self.mode}'"
+            query.where(split_condition, inplace=True)
+
         return query
 
     def _download_images(self) -> None:
@@ -178,71 +259,38 @@ class CXR(BaseDataset):
         main_query = self._calc_query(
             only_count=False,
             downloaded_only=False,
+            split_only=False,
             columns="split.dicom_id",
         )
 
-        count_query = self._calc_query(
-            only_count=True,
-            downloaded_only=False,
-        )
-
-        self.db.exec(
-            SheetQuery.update(
-                self.sheets["split"],
-                {"download": False},
-            )
-        )
-
-        for k in self.label_proportions:
-            m_query = main_query.copy()
-            c_query = count_query.copy()
+        queries = {}
 
+        for k, proportion in self.label_proportions.items():
             if self.download_condition is not None:
-                m_query = self.download_condition(m_query, k)
-                c_query = self.download_condition(c_query, k)
+                query = self.download_condition(main_query.copy(), k)
             else:
                 condition = f"{SheetQuery._parse_column(k)} IS NOT NULL"
-                m_query.where(condition)
-                c_query.where(condition)
-
-            total = 0
-            res = self.db.fetch_one(c_query)
-
-            if res is not None:
-                total = res[0]
+                query = main_query.where(condition, inplace=False)
 
-            total_download = int(total * self.label_proportions[k])
+            queries[k] = (query, proportion)
 
-            m_query.limit(total_download)
+        sample_query = SheetQuery.sample_by_label(queries, "dicom_id", seed=self.seed)
 
-            rows = self.db.fetch_df(m_query)["dicom_id"].to_list()
-
-            if len(rows) == 0:
-                continue
+        self.db.exec(
+            SheetQuery.update_in(self.sheets["split"], "download", "dicom_id", sample_query)
+        )
 
-            self.db.exec(
-                SheetQuery.update(
-                    self.sheets["split"],
-                    {"download": True},
-                ).find_by_id("dicom_id", rows)
-            )
+        if self.materialize:
+            self._materialize()
 
         files = self.db.fetch_df(self.main_query)["image_path"].to_list()
 
-        for file in tqdm(files, desc="Downloading Images"):
-            file_url = f"{env.cxr_url}/{file}"
-            file_root = Path(file).parent
-            file_path = self.raw_folder / file_root
-
-            if (self.raw_folder / str(file)).exists():
-                continue
-
-            download_url(
-                url=file_url,
-                root=file_path,
-                credentials=env.credentials,
-                verbose=False,
-            )
+        download_urls(
+            [(f"{env.cxr_url}/{file}", self.raw_folder / file) for file in files],
+            credentials=env.credentials,
+            max_workers=self.download_workers,
+            desc="Downloading Images",
+        )
 
     def _files(self) -> dict[str, dict[str, Any]]:
         return Env().cxr_files
@@ -268,7 +316,10 @@ class CXR(BaseDataset):
             id_column="dicom_id",
             table_name="split",
             file_name=cxr_files["split"]["name"],
-            transform=_transform_split,
+            expressions={
+                "image_path": _IMAGE_PATH_EXPRESSION,
+                "download": "false",
+            },
             **self.kwargs,
         )
 
@@ -331,25 +382,291 @@ class CXR(BaseDataset):
 
         return sheets
 
-    def _load_image(self, img_path: str) -> Image.Image:
+    def _load_image(self, img_path: str | Path) -> Image.Image:
         image = Image.open(img_path)
 
+        if self.draft_size is not None:
+            image.draft(image.mode, self.draft_size)
+
         if image.mode not in ["RGB", "L"]:
             image = image.convert("RGB")
 
         return image
 
-    def collate_fn(self, idx: list[int]) -> tuple[torch.Tensor, torch.Tensor]:
-        query = self.main_query.find_by_row_id(idx, inplace=False)
-        df = self.db.fetch_df(query).drop(columns=["row_num", "dicom_id"])
+    def _encode_image(
+        self,
+        img_path: str,
+        resize: tuple[int, int] | None,
+        quality: int,
+    ) -> bytes:
+        path = self.raw_folder / img_path
+
+        if resize is None:
+            return path.read_bytes()
+
+        height, width = resize
+        image = Image.open(path)
+        image.draft(image.mode, (width, height))
+
+        if image.mode not in ["RGB", "L"]:
+            image = image.convert("RGB")
+
+        image = transforms.Resize(resize)(image)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+
+        return buffer.getvalue()
+
+    def _shard_digest(
+        self,
+        resize: tuple[int, int] | None,
+        quality: int,
+        samples_per_shard: int,
+    ) -> str:
+        rows = self.db.fetch_one(
+            SheetQuery.aggregate(
+                self.main_query,
+                ["count(*)", "bit_xor(hash(*COLUMNS(* EXCLUDE (row_num))))"],
+            )
+        )
+
+        identity = {
+            "query": self.main_query.parse(),
+            "rows": rows,
+            "sheets": {k: sheet.fingerprint for k, sheet in self.sheets.items()},
+            "label_proportions": self.label_proportions,
+            "seed": self.seed,
+            "download_condition": callable_identity(self.download_condition),
+            "study_transform": callable_identity(self.study_transform),
+            "metadata_transform": callable_identity(self.metadata_transform),
+            "resize": resize,
+            "quality": quality,
+            "samples_per_shard": samples_per_shard,
+        }
+
+        encoded = json.dumps(identity, sort_keys=True, default=str).encode()
+
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def export_shards(
+        self,
+        output_dir: str | Path | None = None,
+        *,
+        resize: tuple[int, int] | None = None,
+        quality: int = 95,
+        samples_per_shard: int = 2000,
+        workers: int = 16,
+    ) -> Path:
+        digest = self._shard_digest(resize, quality, samples_per_shard)
+
+        if output_dir is None:
+            output_dir = self.raw_folder / "shards" / f"{self.mode}-{digest}"
+
+        output_dir = Path(output_dir)
+        index_path = output_dir / "index.json"
+
+        if index_path.exists():
+            if json.loads(index_path.read_text()).get("digest") == digest:
+                return output_dir
+
+            index_path.unlink()
+
+        columns: list[str] = []
+
+        with (
+            ShardWriter(output_dir, self.mode, samples_per_shard) as writer,
+            ThreadPoolExecutor(max_workers=workers) as executor,
+            tqdm(total=len(self), desc="Exporting shards") as p_bar,
+        ):
+            for batch in self.db.fetch_record_batch(self.main_query, samples_per_shard):
+                columns = [name for name in batch.schema.names if name not in _SHARD_KEYS]
+                rows = batch.to_pylist()
+                images = executor.map(
+                    lambda row: self._encode_image(row["image_path"], resize, quality),
+                    rows,
+                )
+
+                for row, image in zip(rows, images, strict=True):
+                    labels = {name: row[name] for name in columns}
+                    writer.write(
+                        row["dicom_id"], {"jpg": image, "json": json.dumps(labels).encode()}
+                    )
+
+                p_bar.update(len(rows))
+
+        index = {
+            "digest": digest,
+            "shards": writer.shards,
+            "columns": columns,
+            "resize": resize,
+            "count": sum(shard["count"] for shard in writer.shards),
+        }
+
+        tmp = index_path.with_name(f"{index_path.name}.part")
+        tmp.write_text(json.dumps(index))
+        tmp.replace(index_path)
+
+        names = {shard["name"] for shard in writer.shards}
+
+        for stale in output_dir.glob(f"{self.mode}-*.tar"):
+            if stale.name not in names:
+                stale.unlink()
+
+        return output_dir
+
+    def _open_image(self, img_path: str) -> Image.Image:
+        with self.metrics.timer("cxr.image_open"):
+            image = self._load_image(self.raw_folder / img_path)
+            image.load()
+
+        return image
+
+    def _prepare_image(self, dicom_id: str, img_path: str) -> torch.Tensor:
+        if self.image_cache is None:
+            image = self._open_image(img_path)
+
+            with self.metrics.timer("cxr.transform"):
+                return self.transform(image)
+
+        array = self.image_cache.get(dicom_id)
+
+        if array is None:
+            self.metrics.count("cxr.cache_misses")
+            image = self._open_image(img_path)
+
+            with self.metrics.timer("cxr.cache_transform"):
+                array = np.asarray(self.cache_transform(image))
+
+            self.image_cache.put(dicom_id, array)
+        else:
+            self.metrics.count("cxr.cache_hits")
+
+        self.metrics.count("cxr.bytes", array.nbytes)
+
+        with self.metrics.timer("cxr.transform"):
+            return self.tensor_transform(Image.fromarray(array))
+
+    def collate_fn(
+        self,
+        idx: list[int],
+    ) -> tuple[torch.Tensor, torch.Tensor | dict[str, torch.Tensor]]:
+        query = self._batch_query(idx)
+
+        with self.metrics.timer("cxr.query"):
+            arrays = self.db.fetch_numpy(query)
+
+        arrays.pop("row_num")
+        self.metrics.count("cxr.rows", len(idx))
+        dicom_ids = arrays.pop("dicom_id")
+        image_paths = arrays.pop("image_path")
 
         images = [
-            self._load_image(self.raw_folder / img_path) for img_path in df["image_path"]
+            self._prepare_image(dicom_id, img_path)
+            for dicom_id, img_path in zip(dicom_ids, image_paths, strict=True)
         ]
 
-        images = [self.transform(img) for img in images]
+        with self.metrics.timer("cxr.stack"):
+            image_tensors = torch.stack(images)
+
+        return image_tensors, self._to_tensor(arrays)
 
-        df_tensor = torch.from_numpy(df.drop(columns=["image_path"]).to_numpy())
-        image_tensors = torch.stack(images)
 
-        return image_tensors, df_tensor
+class CXRShards(IterableDataset):
+    def __init__(
+        self,
+        root: str | Path,
+        transform: Callable[[Any], torch.Tensor] | None = None,
+        columns: list[str] | None = None,
+        *,
+        shuffle_buffer: int = 0,
+        seed: int = 0,
+        as_dict: bool = False,
+    ) -> None:
+        super().__init__()
+
+        self.root = Path(root)
+        self.index = json.loads((self.root / "index.json").read_text())
+        self.columns = columns or self.index["columns"]
+        self.transform = transform or self._create_transform()
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.as_dict = as_dict
+        self.epoch = 0
+
+    def _create_transform(self) -> Callable[[Any], torch.Tensor]:
+        if self.index["resize"] is not None:
+            return transforms.ToTensor()
+
+        return _default_transform()
+
+    def __len__(self) -> int:
+        return self.index["count"]
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def _samples(self, shards: list[dict[str, Any]]) -> Iterator[dict[str, bytes]]:
+        for shard in shards:
+            for _, files in read_shard(self.root / shard["name"]):
+                yield files
+
+    def _shuffle(
+        self,
+        samples: Iterator[dict[str, bytes]],
+        rng: np.random.Generator,
+    ) -> Iterator[dict[str, bytes]]:
+        buffer: list[dict[str, bytes]] = []
+
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+
+            i = rng.integers(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def _decode(self, files: dict[str, bytes]) -> tuple[torch.Tensor, dict[str, Any]]:
+        image = Image.open(io.BytesIO(files["jpg"]))
+
+        if image.mode not in ["RGB", "L"]:
+            image = image.convert("RGB")
+
+        labels = json.loads(files["json"])
+
+        return self.transform(image), {name: labels[name] for name in self.columns}
+
+    def __iter__(self) -> Iterator[tuple[torch.Tensor, dict[str, Any]]]:
+        shard, num_shards = worker_shard()
+        shards = self.index["shards"]
+
+        if self.shuffle_buffer > 0:
+            order = np.random.default_rng((self.seed, self.epoch)).permutation(len(shards))
+            shards = [shards[i] for i in order]
+
+        samples = self._samples(shards[shard::num_shards])
+
+        if self.shuffle_buffer > 0:
+            rng = np.random.default_rng((self.seed, self.epoch, shard))
+            samples = self._shuffle(samples, rng)
+
+        for files in samples:
+            yield self._decode(files)
+
+    def collate_fn(
+        self,
+        batch: list[tuple[torch.Tensor, dict[str, Any]]],
+    ) -> tuple[torch.Tensor, torch.Tensor | dict[str, torch.Tensor]]:
+        images = torch.stack([image for image, _ in batch])
+        arrays = {
+            name: np.array(
+                [np.nan if labels[name] is None else labels[name] for _, labels in batch]
+            )
+            for name in self.columns
+        }
+
+        return images, to_tensor(arrays, as_dict=self.as_dict)
@@ -1,19 +1,299 @@
+import hashlib
+from collections.abc import Iterator
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 import torch
+from numpy.lib.format import open_memmap
+from torch.utils.data import IterableDataset
 
 from mimic.utils.env import Env
+from mimic.utils.sheet import SheetQuery
 
-from .base import BaseDataset
+from .base import BaseDataset, rank_shard, worker_shard
 
 
 class IV(BaseDataset):
     def _files(self) -> dict[str, dict[str, Any]]:
         return Env().iv_files
 
-    def collate_fn(self, idx: list[int]) -> torch.Tensor:
-        query = self.main_query.find_by_row_id(idx, inplace=False)
+    def collate_fn(self, idx: list[int]) -> torch.Tensor | dict[str, torch.Tensor]:
+        query = self._batch_query(idx)
 
-        df = self.db.fetch_df(query).drop(columns=["row_num"])
+        with self.metrics.timer("iv.query"):
+            arrays = self.db.fetch_numpy(query)
 
-        return torch.from_numpy(df.to_numpy())
+        arrays.pop("row_num")
+        self.metrics.count("iv.rows", len(idx))
+
+        with self.metrics.timer("iv.tensor"):
+            return self._to_tensor(arrays)
+
+
+class IVStream(IV, IterableDataset):
+    def __init__(
+        self,
+        *args: Any,
+        batch_size: int = 1024,
+        shuffle_buffer: int = 0,
+        seed: int = 0,
+        rows_per_batch: int = 65536,
+        num_workers: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rows_per_batch = rows_per_batch
+        self.num_workers = num_workers
+        self.epoch = 0
+
+        super().__init__(*args, **kwargs)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def _rows(self) -> int:
+        return super().__len__()
+
+    @staticmethod
+    def _bounds(rows: int, shard: int, num_shards: int) -> tuple[int, int]:
+        return rows * shard // num_shards, rows * (shard + 1) // num_shards
+
+    def __len__(self) -> int:
+        rows = self._rows()
+        rank, world_size = rank_shard()
+        workers = max(1, self.num_workers)
+        batches = 0
+
+        for shard in range(rank * workers, (rank + 1) * workers):
+            start, end = self._bounds(rows, shard, world_size * workers)
+            batches += -(-(end - start) // self.batch_size)
+
+        return batches
+
+    def _stream_query(self, start: int, end: int) -> SheetQuery:
+        if self.batch_table is None:
+            return self.main_query.find_by_row_range(start, end, inplace=False)
+
+        return SheetQuery.from_table(self.batch_table).find_by_row_range(start, end)
+
+    def _chunks(self, start: int, end: int) -> Iterator[dict[str, np.ndarray]]:
+        query = self._stream_query(start, end)
+
+        for batch in self.db.fetch_record_batch(query, self.rows_per_batch):
+            arrays = {
+                name: column.to_numpy(zero_copy_only=False)
+                for name, column in zip(batch.schema.names, batch.columns, strict=True)
+            }
+            arrays.pop("row_num")
+
+            yield arrays
+
+    def _split(
+        self,
+        arrays: dict[str, np.ndarray],
+        rng: np.random.Generator | None,
+        *,
+        final: bool,
+    ) -> tuple[list[dict[str, np.ndarray]], dict[str, np.ndarray]]:
+        size = len(next(iter(arrays.values())))
+
+        if rng is not None:
+            perm = rng.permutation(size)
+            arrays = {name: arr[perm] for name, arr in arrays.items()}
+
+        stop = size if final else size - size % self.batch_size
+        batches = [
+            {name: arr[i : i + self.batch_size] for name, arr in arrays.items()}
+            for i in range(0, stop, self.batch_size)
+        ]
+        rest = {name: arr[stop:] for name, arr in arrays.items()}
+
+        return batches, rest
+
+    def __iter__(self) -> Iterator[torch.Tensor | dict[str, torch.Tensor]]:
+        shard, num_shards = worker_shard()
+        start, end = self._bounds(self._rows(), shard, num_shards)
+
+        rng = None
+
+        if self.shuffle_buffer > 0:
+            rng = np.random.default_rng((self.seed, self.epoch, shard))
+
+        threshold = max(self.shuffle_buffer, self.batch_size)
+        pending: list[dict[str, np.ndarray]] = []
+        pending_rows = 0
+
+        for chunk in self._chunks(start, end):
+            pending.append(chunk)
+            pending_rows += len(next(iter(chunk.values()), []))
+
+            if pending_rows < threshold:
+                continue
+
+            arrays = {name: np.concatenate([p[name] for p in pending]) for name in chunk}
+            batches, rest = self._split(arrays, rng, final=False)
+
+            for batch in batches:
+                yield self._to_tensor(batch)
+
+            pending = [rest]
+            pending_rows = len(next(iter(rest.values()), []))
+
+        if pending_rows > 0:
+            names = pending[0].keys()
+            arrays = {name: np.concatenate([p[name] for p in pending]) for name in names}
+            batches, _ = self._split(arrays, rng, final=True)
+
+            for batch in batches:
+                yield self._to_tensor(batch)
+
+
+class IVTimeSeries(IV):
+    def __init__(
+        self,
+        *args: Any,
+        key_column: str = "stay_id",
+        time_column: str = "charttime",
+        value_column: str = "valuenum",
+        item_column: str = "itemid",
+        max_length: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.key_column = key_column
+        self.time_column = time_column
+        self.value_column = value_column
+        self.item_column = item_column
+        self.max_length = max_length
+        self._arrays: dict[str, np.ndarray] | None = None
+
+        super().__init__(*args, **kwargs)
+
+        if not kwargs.get("skip_load", False):
+            self._build_csr()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def _events_query(self) -> SheetQuery:
+        return SheetQuery.events(
+            self.main_query,
+            self.key_column,
+            self.time_column,
+            self.value_column,
+            self.item_column,
+        )
+
+    @property
+    def csr_folder(self) -> Path:
+        identity = [self._events_query().parse()]
+        identity += [self.sheets[k].fingerprint for k in sorted(self.sheets)]
+        digest = hashlib.sha256("\n".join(identity).encode()).hexdigest()[:16]
+
+        return self.raw_folder / "timeseries" / digest
+
+    def _build_csr(self) -> None:
+        folder = self.csr_folder
+
+        if folder.exists():
+            return
+
+        events = self._events_query()
+        res = self.db.fetch_one(
+            SheetQuery.aggregate(events, ["COUNT(*)", "COUNT(DISTINCT key)"])
+        )
+        n_events, n_keys = (0, 0) if res is None else res
+
+        tmp = folder.with_name(f"{folder.name}.tmp")
+        tmp.mkdir(parents=True, exist_ok=True)
+
+        arrays = {
+            "keys": open_memmap(tmp / "keys.npy", "w+", np.int64, (n_keys,)),
+            "offsets": open_memmap(tmp / "offsets.npy", "w+", np.int64, (n_keys + 1,)),
+            "times": open_memmap(tmp / "times.npy", "w+", np.float64, (n_events,)),
+            "values": open_memmap(tmp / "values.npy", "w+", np.float32, (n_events,)),
+            "itemids": open_memmap(tmp / "itemids.npy", "w+", np.int64, (n_events,)),
+        }
+
+        pos, count = 0, 0
+        last_key: int | None = None
+
+        for batch in self.db.fetch_record_batch(events):
+            key, time, value, item = (
+                column.to_numpy(zero_copy_only=False) for column in batch.columns
+            )
+            size = len(key)
+
+            if size == 0:
+                continue
+
+            prev = np.concatenate(
+                [[key[0] - 1 if last_key is None else last_key], key[:-1]]
+            )
+            starts = np.flatnonzero(key != prev)
+
+            arrays["keys"][count : count + len(starts)] = key[starts]
+            arrays["offsets"][count : count + len(starts)] = pos + starts
+            arrays["times"][pos : pos + size] = time
+            arrays["values"][pos : pos + size] = value
+            arrays["itemids"][pos : pos + size] = item
+
+            pos += size
+            count += len(starts)
+            last_key = int(key[-1])
+
+        arrays["offsets"][n_keys] = n_events
+
+        for array in arrays.values():
+            array.flush()
+
+        del arrays
+        tmp.replace(folder)
+
+    def _csr(self) -> dict[str, np.ndarray]:
+        if self._arrays is None:
+            self._build_csr()
+
+            self._arrays = {
+                name: np.load(self.csr_folder / f"{name}.npy", mmap_mode="r")
+                for name in ("keys", "offsets", "times", "values", "itemids")
+            }
+
+        return self._arrays
+
+    def __len__(self) -> int:
+        return len(self._csr()["keys"])
+
+    def collate_fn(self, idx: list[int]) -> dict[str, torch.Tensor]:
+        csr = self._csr()
+        rows = np.asarray(idx, dtype=np.int64)
+
+        starts = csr["offsets"][rows]
+        ends = csr["offsets"][rows + 1]
+
+        if self.max_length is not None:
+            starts = np.maximum(starts, ends - self.max_length)
+
+        lengths = ends - starts
+        width = int(lengths.max(initial=0))
+
+        steps = np.arange(width)
+        mask = steps < lengths[:, None]
+        positions = np.where(mask, starts[:, None] + steps, 0)
+
+        values = np.where(mask, csr["values"][positions], 0).astype(np.float32)
+        times = np.where(mask, csr["times"][positions], 0)
+        itemids = np.where(mask, csr["itemids"][positions], 0)
+
+        return {
+            self.key_column: torch.from_numpy(np.asarray(csr["keys"][rows])),
+            "values": torch.from_numpy(values),
+            "times": torch.from_numpy(times),
+            "itemids": torch.from_numpy(itemids),
+            "mask": torch.from_numpy(mask),
+            "lengths": torch.from_numpy(lengths),
+        }
@@ -1,28 +1,70 @@
-import base64
+import gzip
+import hashlib
 import logging
 import os
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Any, BinaryIO
 
 import requests
 from torchvision.datasets.utils import check_integrity, extract_archive
 from tqdm import tqdm
 
+from .artifacts import ArtifactStore
+from .download import auth_headers
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class _GunzipWriter:
+    def __init__(self, fh: BinaryIO) -> None:
+        self.fh = fh
+        self.decompressor = zlib.decompressobj(_GZIP_WBITS)
+        self.started = False
+
+    def write(self, data: bytes) -> None:
+        while data:
+            self.started = True
+            self.fh.write(self.decompressor.decompress(data))
+
+            if not self.decompressor.eof:
+                return
+
+            data = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(_GZIP_WBITS)
+            self.started = False
+
+    def close(self) -> None:
+        self.fh.write(self.decompressor.flush())
+
+        if self.started and not self.decompressor.eof:
+            msg = "Compressed file ended before the end-of-stream marker was reached"
+            raise EOFError(msg)
+
+
+def _is_gzip(path: str | Path) -> bool:
+    suffixes = Path(path).suffixes
+
+    return suffixes[-1:] == [".gz"] and suffixes[-2:] != [".tar", ".gz"]
+
+
+def _part(path: Path) -> Path:
+    return path.with_name(f"{path.name}.part")
+
 
 def _urlretrieve(
     url: str,
     filename: str | Path,
     credentials: dict[str, str],
-    chunk_size: int = 1024 * 32,
-) -> None:
+    extract_path: str | Path | None = None,
+    chunk_size: int = 1024 * 1024,
+) -> str | None:
     filename = Path(filename)
-    username = credentials["username"]
-    password = credentials["password"]
-    auth_string = f"{username}:{password}"
-    auth_header = base64.b64encode(auth_string.encode()).decode()
-    headers = {
-        "User-Agent": "Wget/1.21.4",
-        "Authorization": f"Basic {auth_header}",
-    }
+    headers = auth_headers(credentials)
+    md5 = hashlib.md5(usedforsecurity=False)
 
     try:
         with requests.get(
@@ -35,18 +77,89 @@ def _urlretrieve(
 
             total_size = int(response.headers.get("content-length", 0))
 
-            with (
-                filename.open("wb") as fh,
-                tqdm(total=total_size, unit="B", unit_scale=True) as p_bar,
-            ):
+            with ExitStack() as stack:
+                fh = stack.enter_context(filename.open("wb"))
+                p_bar = stack.enter_context(
+                    tqdm(
+                        total=total_size,
+                        unit="B",
+                        unit_scale=True,
+                        desc=Path(url).name,
+                        leave=False,
+                    )
+                )
+
+                gunzip = None
+                if extract_path is not None:
+                    gunzip = _GunzipWriter(
+                        stack.enter_context(Path(extract_path).open("wb"))
+                    )
+
                 for chunk in response.iter_content(chunk_size=chunk_size):
                     fh.write(chunk)
+                    md5.update(chunk)
+
+                    if gunzip is not None:
+                        gunzip.write(chunk)
+
                     p_bar.update(len(chunk))
 
+                if gunzip is not None:
+                    gunzip.close()
+
     except requests.exceptions.Timeout:
         logging.info("The request timed out!")
     except requests.exceptions.RequestException as e:
         logging.info(f"An error occurred: {e}")
+    except (EOFError, zlib.error) as e:
+        logging.info(f"Failed to decompress {url}: {e}")
+    else:
+        return md5.hexdigest()
+
+    return None
+
+
+def _gunzip(
+    archive: str | Path,
+    destination: str | Path,
+    chunk_size: int = 1024 * 1024,
+) -> None:
+    destination = Path(destination)
+    part = _part(destination)
+
+    with gzip.open(archive, "rb") as src, part.open("wb") as dst:
+        shutil.copyfileobj(src, dst, chunk_size)
+
+    part.replace(destination)
+
+
+def _retrieve(
+    url: str,
+    fpath: Path,
+    credentials: dict[str, str],
+    md5: str | None,
+    extract_path: str | Path | None,
+) -> None:
+    parts = [(_part(fpath), fpath)]
+    extract_part = None
+
+    if extract_path is not None:
+        extract_path = Path(extract_path)
+        extract_path.parent.mkdir(parents=True, exist_ok=True)
+        extract_part = _part(extract_path)
+        parts.append((extract_part, extract_path))
+
+    digest = _urlretrieve(url, parts[0][0], credentials, extract_part)
+
+    if digest is None or (md5 is not None and digest != md5):
+        for part, _ in parts:
+            part.unlink(missing_ok=True)
+
+        msg = "File not found or corrupted."
+        raise RuntimeError(msg)
+
+    for part, path in parts:
+        part.replace(path)
 
 
 def download_url(
@@ -56,28 +169,39 @@ def download_url(
     filename: str | Path | None = None,
     md5: str | None = None,
     *,
+    extract_path: str | Path | None = None,
+    store: ArtifactStore | None = None,
     verbose: bool = True,
-) -> None:
+) -> bool:
     root = Path(root).expanduser()
     if not filename:
         filename = Path(url).name
 
-    fpath = os.fspath(root / filename)
+    fpath = root / filename
+    store = store or ArtifactStore.from_env()
 
     root.mkdir(parents=True, exist_ok=True)
 
-    if check_integrity(fpath, md5):
+    if check_integrity(os.fspath(fpath), md5):
         if verbose:
             logging.info(f"Using downloaded and verified file: {fpath}")
-        return
+        return False
+
+    if store is not None and store.link(url, md5, fpath):
+        return extract_path is not None and store.link(url, md5, extract_path, "gunzip")
 
     if verbose:
         logging.info(f"Downloading {url} to {fpath}")
-    _urlretrieve(url, fpath, credentials)
 
-    if not check_integrity(fpath, md5):
-        msg = "File not found or corrupted."
-        raise RuntimeError(msg)
+    _retrieve(url, fpath, credentials, md5, extract_path)
+
+    if store is not None:
+        store.put(url, md5, fpath)
+
+        if extract_path is not None:
+            store.put(url, md5, extract_path, "gunzip")
+
+    return True
 
 
 def download_and_extract_archive(
@@ -88,7 +212,9 @@ def download_and_extract_archive(
     filename: str | Path | None = None,
     md5: str | None = None,
     *,
+    extract: bool = True,
     remove_finished: bool = False,
+    store: ArtifactStore | None = None,
     verbose: bool = True,
 ) -> None:
     download_root = Path(download_root).expanduser()
@@ -97,16 +223,86 @@ def download_and_extract_archive(
     if not filename:
         filename = Path(url).name
 
-    download_url(
+    archive = download_root / filename
+    store = store or ArtifactStore.from_env()
+    stream = extract and _is_gzip(archive)
+    destination = Path(extract_root) / archive.stem
+
+    downloaded = download_url(
         url=url,
         root=download_root,
         credentials=credentials,
         filename=filename,
         md5=md5,
+        extract_path=destination if stream else None,
+        store=store,
         verbose=verbose,
     )
 
-    archive = download_root / filename
-    if verbose:
-        logging.info(f"Extracting {archive} to {extract_root}")
-    extract_archive(archive, extract_root, remove_finished)
+    if not extract:
+        return
+
+    if not stream:
+        if verbose:
+            logging.info(f"Extracting {archive} to {extract_root}")
+        extract_archive(archive, extract_root, remove_finished)
+        return
+
+    if not downloaded:
+        if verbose:
+            logging.info(f"Extracting {archive} to {destination}")
+        _gunzip(archive, destination)
+
+        if store is not None:
+            store.put(url, md5, destination, "gunzip")
+
+    if remove_finished:
+        archive.unlink()
+
+
+def download_and_extract_archives(
+    resources: list[dict[str, Any]],
+    credentials: dict[str, str],
+    max_workers: int = 4,
+    *,
+    extract: bool = True,
+    remove_finished: bool = False,
+    desc: str = "Downloading",
+) -> None:
+    if len(resources) == 0:
+        return
+
+    store = ArtifactStore.from_env()
+
+    failures: list[tuple[str, BaseException]] = []
+
+    with (
+        ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor,
+        tqdm(total=len(resources), desc=desc) as p_bar,
+    ):
+        futures = {
+            executor.submit(
+                download_and_extract_archive,
+                url=f["url"],
+                download_root=f["download_root"],
+                credentials=credentials,
+                md5=f.get("md5"),
+                extract=extract,
+                remove_finished=remove_finished,
+                store=store,
+            ): f["url"]
+            for f in resources
+        }
+
+        for future in as_completed(futures):
+            error = future.exception()
+
+            if error is not None:
+                failures.append((futures[future], error))
+                logging.info(f"Failed to download {futures[future]}: {error}")
+
+            p_bar.update(1)
+
+    if failures:
+        msg = f"{len(failures)} of {len(resources)} downloads failed."
+        raise RuntimeError(msg) from failures[0][1]
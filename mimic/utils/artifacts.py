@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+from .env import Env
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_FICLONE = 0x40049409
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    if fcntl is None:
+        return False
+
+    try:
+        with source.open("rb") as src, destination.open("wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError:
+        destination.unlink(missing_ok=True)
+        return False
+
+    return True
+
+
+def link_file(source: str | Path, destination: str | Path, *, symlink: bool = True) -> str:
+    source = Path(source)
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = destination.with_name(f"{destination.name}.{uuid.uuid4().hex}.link")
+
+    try:
+        os.link(source, tmp)
+        mode = "hardlink"
+    except OSError:
+        if _reflink(source, tmp):
+            mode = "reflink"
+        elif symlink:
+            tmp.symlink_to(source.resolve())
+            mode = "symlink"
+        else:
+            shutil.copyfile(source, tmp)
+            mode = "copy"
+
+    tmp.replace(destination)
+
+    return mode
+
+
+class ArtifactStore:
+    def __init__(self, root: str | Path, max_bytes: int | None = None) -> None:
+        self.root = Path(root).expanduser()
+        self.max_bytes = max_bytes
+
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ArtifactStore | None":
+        env = Env()
+
+        if not env.artifact_root:
+            return None
+
+        return cls(env.artifact_root, env.artifact_max_bytes)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, md5: str | None = None, variant: str = "") -> str:
+        identity = f"{url}\n{md5 or ''}\n{variant}"
+
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+
+        for entry in self.root.glob("??/*"):
+            try:
+                mtime = entry.stat().st_mtime
+                stats = [f.stat() for f in entry.iterdir()]
+            except FileNotFoundError:
+                continue
+
+            if any(st.st_nlink > 1 for st in stats):
+                continue
+
+            entries.append((mtime, sum(st.st_size for st in stats), entry))
+
+        return entries
+
+    def get(self, url: str, md5: str | None = None, variant: str = "") -> Path | None:
+        entry = self._entry(self.key(url, md5, variant))
+
+        try:
+            path = next(entry.iterdir())
+            os.utime(entry)
+        except (FileNotFoundError, StopIteration):
+            return None
+
+        return path
+
+    def link(
+        self,
+        url: str,
+        md5: str | None,
+        destination: str | Path,
+        variant: str = "",
+    ) -> bool:
+        path = self.get(url, md5, variant)
+
+        if path is None:
+            return False
+
+        try:
+            mode = link_file(path, destination, symlink=self.max_bytes is None)
+        except FileNotFoundError:
+            return False
+
+        logging.info(f"Linked {destination} from artifact store ({mode})")
+
+        return True
+
+    def put(
+        self,
+        url: str,
+        md5: str | None,
+        source: str | Path,
+        variant: str = "",
+    ) -> Path:
+        source = Path(source)
+        key = self.key(url, md5, variant)
+        entry = self._entry(key)
+        path = entry / source.name
+
+        if path.exists():
+            os.utime(entry)
+            return path
+
+        tmp = self.root / "tmp" / uuid.uuid4().hex
+        link_file(source, tmp / source.name, symlink=False)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            tmp.rename(entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return path
+
+        stat = (entry / source.name).stat()
+
+        if stat.st_nlink == 1:
+            self._track(stat.st_size, entry)
+
+        return path
+
+    def _track(self, size: int, keep: Path) -> None:
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += size
+
+            if self._size > self.max_bytes:
+                self._size = self._evict(self.max_bytes, keep)
+
+    def _evict(self, max_bytes: int, keep: Path | None = None) -> int:
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry in entries:
+            if total <= max_bytes:
+                break
+
+            if entry == keep:
+                continue
+
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+        return total
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        limit = self.max_bytes if max_bytes is None else max_bytes
+
+        with self._lock:
+            self._size = sum(size for _, size, _ in self._entries())
+
+            if limit is not None and self._size > limit:
+                self._size = self._evict(limit)
+
+            return self._size
@@ -0,0 +1,136 @@
+import os
+import socket
+import time
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+import numpy as np
+
+
+class ImageCache:
+    def __init__(
+        self,
+        root: str | Path,
+        fingerprint: str,
+        refresh_interval: float = 1.0,
+    ) -> None:
+        self.root = Path(root) / fingerprint
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.refresh_interval = refresh_interval
+
+        self._index: dict[str, tuple[str, int, tuple[int, ...]]] = {}
+        self._positions: dict[str, int] = {}
+        self._refreshed = 0.0
+        self._shards: dict[str, np.memmap] = {}
+        self._writer: tuple[str, BinaryIO, TextIO] | None = None
+        self._writer_pid: int | None = None
+
+        self._load_index()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        state["_writer"] = None
+        state["_writer_pid"] = None
+        return state
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load_index(self) -> None:
+        self._refreshed = time.monotonic()
+
+        for index_path in sorted(self.root.glob("*.idx")):
+            shard = index_path.stem
+            position = self._positions.get(shard, 0)
+
+            with index_path.open("rb") as fh:
+                fh.seek(position)
+                data = fh.read()
+
+            end = data.rfind(b"\n") + 1
+            self._positions[shard] = position + end
+
+            for line in data[:end].decode().splitlines():
+                parts = line.split("\t")
+
+                if len(parts) != 3:  # noqa: PLR2004
+                    continue
+
+                key, offset, shape = parts
+                self._index[key] = (
+                    shard,
+                    int(offset),
+                    tuple(int(s) for s in shape.split(",")),
+                )
+
+    def refresh(self, *, force: bool = False) -> None:
+        if force or time.monotonic() - self._refreshed >= self.refresh_interval:
+            self._load_index()
+
+    def _shard(self, shard: str, end: int) -> np.memmap:
+        mm = self._shards.get(shard)
+
+        if mm is None or mm.shape[0] < end:
+            mm = np.memmap(self.root / f"{shard}.bin", dtype=np.uint8, mode="r")
+            self._shards[shard] = mm
+
+        return mm
+
+    def _open_writer(self) -> tuple[str, BinaryIO, TextIO]:
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return self._writer
+
+        shard = f"{socket.gethostname()}-{os.getpid()}"
+        data_fh = (self.root / f"{shard}.bin").open("ab")
+        index_fh = (self.root / f"{shard}.idx").open("a")
+
+        self._writer = (shard, data_fh, index_fh)
+        self._writer_pid = os.getpid()
+
+        return self._writer
+
+    def get(self, key: str) -> np.ndarray | None:
+        entry = self._index.get(key)
+
+        if entry is None:
+            self.refresh()
+            entry = self._index.get(key)
+
+        if entry is None:
+            return None
+
+        shard, offset, shape = entry
+        size = int(np.prod(shape))
+        mm = self._shard(shard, offset + size)
+
+        return mm[offset : offset + size].reshape(shape)
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        if key in self._index:
+            return
+
+        array = np.ascontiguousarray(array, dtype=np.uint8)
+        shard, data_fh, index_fh = self._open_writer()
+
+        offset = data_fh.seek(0, os.SEEK_END)
+        data_fh.write(array.tobytes())
+        data_fh.flush()
+
+        index_fh.write(f"{key}\t{offset}\t{','.join(map(str, array.shape))}\n")
+        index_fh.flush()
+
+        self._index[key] = (shard, offset, array.shape)
+
+    def close(self) -> None:
+        if self._writer is not None and self._writer_pid == os.getpid():
+            _, data_fh, index_fh = self._writer
+            data_fh.close()
+            index_fh.close()
+
+        self._writer = None
+        self._writer_pid = None
+        self._shards.clear()
@@ -1,47 +1,294 @@
+import math
+import os
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import duckdb
+import numpy as np
 import pandas as pd
 
+from .metrics import Metrics
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def sql_literal(value: Any) -> str:
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if value is None:
+        return "NULL"
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    if isinstance(value, str):
+        escaped = value.replace("'", "''")
+        return f"'{escaped}'"
+
+    if isinstance(value, (list, tuple)):
+        return f"[{','.join(sql_literal(v) for v in value)}]"
+
+    return repr(value)
+
+
+_MAX_INLINE_STRING = 1024
+
+
+def _inline_literal(value: Any) -> str | None:
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if value is None or isinstance(value, (bool, int)):
+        return sql_literal(value)
+
+    if isinstance(value, float):
+        return f"{value!r}::DOUBLE" if math.isfinite(value) else None
+
+    if isinstance(value, str) and len(value) <= _MAX_INLINE_STRING:
+        return sql_literal(value)
+
+    return None
+
 
 class Query(ABC):
     @abstractmethod
     def parse(self) -> str:
         pass
 
+    def parameters(self) -> dict[str, Any]:
+        return {}
+
 
 class DuckDB:
     def __init__(
         self,
         root: str | Path,
         db_name: str,
+        *,
+        read_only: bool = False,
+        statement_cache_size: int = 64,
+        metrics: Metrics | None = None,
     ) -> None:
         root = Path(root)
         root.mkdir(parents=True, exist_ok=True)
-        db_path = root / db_name
-        self.conn = duckdb.connect(database=db_path, read_only=False)
+        self.db_path = root / db_name
+        self.read_only = read_only
+        self.version = 0
+        self.statement_cache_size = statement_cache_size
+        self.statement_hits = 0
+        self.statement_misses = 0
+        self.metrics = metrics or Metrics(enabled=False)
+
+        self._conn: duckdb.DuckDBPyConnection | None = None
+        self._pid: int | None = None
+        self._thread: int | None = None
+        self._local = threading.local()
+        self._cursors: list[duckdb.DuckDBPyConnection] = []
+        self._cursors_lock = threading.Lock()
+        self._statements: OrderedDict[str, str] = OrderedDict()
+        self._statement_id = 0
+
+        self._connect()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_pid"] = None
+        state["_thread"] = None
+        state["_statements"] = OrderedDict()
+        state["_cursors"] = []
+        del state["_local"]
+        del state["_cursors_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._cursors_lock = threading.Lock()
+
+    def _enable_profiling(self, conn: duckdb.DuckDBPyConnection) -> None:
+        if self.metrics.enabled and self.metrics.profile_queries:
+            conn.execute("PRAGMA enable_profiling='no_output'")
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        if self._pid is not None and self._pid != os.getpid():
+            self._cursors = []
+            self._cursors_lock = threading.Lock()
+
+        conn = duckdb.connect(database=self.db_path, read_only=self.read_only)
+        self._conn = conn
+        self._pid = os.getpid()
+        self._thread = threading.get_ident()
+        self._statements = OrderedDict()
+
+        self._enable_profiling(conn)
+
+        return conn
+
+    def _connection(self) -> tuple[duckdb.DuckDBPyConnection, OrderedDict[str, str]]:
+        conn = self._conn
+
+        if conn is None or self._pid != os.getpid():
+            conn = self._connect()
+
+        if threading.get_ident() == self._thread:
+            return conn, self._statements
+
+        local = self._local
+
+        if getattr(local, "parent", None) is not conn:
+            local.conn = conn.cursor()
+            local.parent = conn
+            local.statements = OrderedDict()
+            self._enable_profiling(local.conn)
+
+            with self._cursors_lock:
+                self._cursors.append(local.conn)
+
+        return local.conn, local.statements
+
+    @property
+    def conn(self) -> duckdb.DuckDBPyConnection:
+        return self._connection()[0]
 
     def close(self) -> None:
-        self.conn.close()
+        with self._cursors_lock:
+            cursors, self._cursors = self._cursors, []
 
-    def exec(self, query: Query) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            for cursor in cursors:
+                cursor.close()
+
+            self._conn.close()
+
+        self._conn = None
+        self._pid = None
+
+    def reopen(self, *, read_only: bool | None = None) -> None:
+        self.close()
+        self.version += 1
+
+        if read_only is not None:
+            self.read_only = read_only
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+        self._enable_profiling(self.conn)
+
+    def register(self, name: str, obj: Any) -> None:
+        self.conn.register(name, obj)
+
+    def unregister(self, name: str) -> None:
+        self.conn.unregister(name)
+
+    def statement_cache_info(self) -> dict[str, int | float]:
+        total = self.statement_hits + self.statement_misses
+
+        return {
+            "hits": self.statement_hits,
+            "misses": self.statement_misses,
+            "size": len(self._connection()[1]),
+            "max_size": self.statement_cache_size,
+            "hit_rate": self.statement_hits / total if total else 0.0,
+        }
+
+    def _prepare(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        statements: OrderedDict[str, str],
+        query_str: str,
+        key: str,
+    ) -> str:
+        name = statements.get(key)
+
+        if name is not None:
+            statements.move_to_end(key)
+            self.statement_hits += 1
+            return name
+
+        self.statement_misses += 1
+
+        if len(statements) >= self.statement_cache_size:
+            _, evicted = statements.popitem(last=False)
+            conn.execute(f"DEALLOCATE {evicted}")
+
+        self._statement_id += 1
+        name = f"statement_{self._statement_id}"
+
+        conn.execute(f"PREPARE {name} AS {query_str.rstrip(';')}")
+        statements[key] = name
+
+        return name
+
+    def _execute(self, query: Query) -> duckdb.DuckDBPyConnection:
         query_str = query.parse()
+        params = query.parameters()
+        conn, statements = self._connection()
+
+        if not params or self.statement_cache_size <= 0:
+            return conn.execute(query_str, params or None)
+
+        literals = {key: _inline_literal(value) for key, value in params.items()}
 
-        self.conn.execute(query_str)
+        if any(literal is None for literal in literals.values()):
+            return conn.execute(query_str, params)
+
+        types = ",".join(f"{key}:{type(value).__name__}" for key, value in params.items())
+        name = self._prepare(conn, statements, query_str, f"{query_str}\0{types}")
+        args = ",".join(f"{key} := {literal}" for key, literal in literals.items())
+
+        return conn.execute(f"EXECUTE {name}({args})")
+
+    def _run(self, name: str, query: Query, fetch: Callable[[Any], Any]) -> Any:
+        metrics = self.metrics
+
+        if not metrics.enabled:
+            return fetch(self._execute(query))
+
+        with metrics.timer(name):
+            result = fetch(self._execute(query))
+
+        if metrics.profile_queries:
+            metrics.add_profile(
+                query.parse(), self.conn.get_profiling_information(format="json")
+            )
+
+        return result
+
+    def exec(self, query: Query) -> None:
+        self._run("db.exec", query, lambda _: None)
+        self.version += 1
 
     def fetch_df(self, query: Query) -> pd.DataFrame:
-        query_str = query.parse()
+        return self._run("db.fetch_df", query, lambda r: r.fetch_df())
 
-        return self.conn.execute(query_str).fetch_df()
+    def fetch_numpy(self, query: Query) -> dict[str, np.ndarray]:
+        return self._run("db.fetch_numpy", query, lambda r: r.fetchnumpy())
 
-    def fetch_one(self, query: Query) -> tuple[Any, ...] | None:
-        query_str = query.parse()
+    def fetch_arrow(self, query: Query) -> "pa.Table":
+        return self._run("db.fetch_arrow", query, lambda r: r.fetch_arrow_table())
 
-        return self.conn.execute(query_str).fetchone()
+    def fetch_record_batch(
+        self,
+        query: Query,
+        rows_per_batch: int = 1_000_000,
+    ) -> Iterator["pa.RecordBatch"]:
+        cursor = self.conn.cursor()
 
-    def fetch_all(self, query: Query) -> list:
-        query_str = query.parse()
+        try:
+            result = cursor.execute(query.parse(), query.parameters() or None)
+            yield from result.fetch_record_batch(rows_per_batch)
+        finally:
+            cursor.close()
+
+    def fetch_one(self, query: Query) -> tuple[Any, ...] | None:
+        return self._run("db.fetch_one", query, lambda r: r.fetchone())
 
-        return self.conn.execute(query_str).fetchall()
+    def fetch_all(self, query: Query) -> list:
+        return self._run("db.fetch_all", query, lambda r: r.fetchall())
@@ -0,0 +1,165 @@
+import base64
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+from .artifacts import ArtifactStore
+
+_NON_RETRYABLE_STATUS = {400, 401, 403, 404}
+_RANGE_NOT_SATISFIABLE = 416
+_PARTIAL_CONTENT = 206
+_MAX_REPORTED_FAILURES = 20
+
+
+def auth_headers(credentials: dict[str, str]) -> dict[str, str]:
+    username = credentials["username"]
+    password = credentials["password"]
+    auth_string = f"{username}:{password}"
+    auth_header = base64.b64encode(auth_string.encode()).decode()
+
+    return {
+        "User-Agent": "Wget/1.21.4",
+        "Authorization": f"Basic {auth_header}",
+    }
+
+
+def create_session(credentials: dict[str, str], pool_size: int = 16) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(auth_headers(credentials))
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def _is_complete(response: requests.Response, offset: int) -> bool:
+    content_range = response.headers.get("content-range", "")
+    total = content_range.rpartition("/")[2]
+
+    return total.isdigit() and int(total) == offset
+
+
+def _fetch(
+    session: requests.Session,
+    url: str,
+    path: Path,
+    chunk_size: int,
+) -> None:
+    part = path.with_name(f"{path.name}.part")
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=(5, 30)) as response:
+        if response.status_code == _RANGE_NOT_SATISFIABLE and offset:
+            if not _is_complete(response, offset):
+                part.unlink()
+                response.raise_for_status()
+
+            part.replace(path)
+            return
+
+        response.raise_for_status()
+
+        if response.status_code != _PARTIAL_CONTENT:
+            offset = 0
+
+        with part.open("ab" if offset else "wb") as fh:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fh.write(chunk)
+
+    part.replace(path)
+
+
+def download_file(
+    session: requests.Session,
+    url: str,
+    path: str | Path,
+    *,
+    retries: int = 3,
+    backoff: float = 1.0,
+    chunk_size: int = 1024 * 256,
+    store: ArtifactStore | None = None,
+) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if store is not None and store.link(url, None, path):
+        return
+
+    for attempt in range(retries + 1):
+        try:
+            _fetch(session, url, path, chunk_size)
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+
+            if attempt == retries or status in _NON_RETRYABLE_STATUS:
+                raise
+
+            delay = backoff * 2**attempt
+            logging.info(f"Retrying {url} in {delay:.1f}s: {e}")
+            time.sleep(delay)
+        else:
+            if store is not None:
+                store.put(url, None, path)
+            return
+
+
+def download_urls(
+    files: list[tuple[str, str | Path]],
+    credentials: dict[str, str],
+    *,
+    max_workers: int = 16,
+    retries: int = 3,
+    backoff: float = 1.0,
+    desc: str = "Downloading",
+) -> None:
+    pending = [(url, Path(path)) for url, path in files if not Path(path).exists()]
+
+    if len(pending) == 0:
+        return
+
+    failures: list[tuple[str, BaseException]] = []
+    store = ArtifactStore.from_env()
+
+    with (
+        create_session(credentials, pool_size=max_workers) as session,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+        tqdm(total=len(files), initial=len(files) - len(pending), desc=desc) as p_bar,
+    ):
+        futures = {
+            executor.submit(
+                download_file,
+                session,
+                url,
+                path,
+                retries=retries,
+                backoff=backoff,
+                store=store,
+            ): url
+            for url, path in pending
+        }
+
+        for future in as_completed(futures):
+            error = future.exception()
+
+            if error is not None:
+                failures.append((futures[future], error))
+                logging.warning(f"Failed to download {futures[future]}: {error}")
+
+            p_bar.update(1)
+
+    if failures:
+        urls = "\n".join(f"  {url}" for url, _ in failures[:_MAX_REPORTED_FAILURES])
+
+        if len(failures) > _MAX_REPORTED_FAILURES:
+            urls += f"\n  ... and {len(failures) - _MAX_REPORTED_FAILURES} more"
+
+        msg = f"{len(failures)} of {len(pending)} downloads failed:\n{urls}"
+        raise RuntimeError(msg) from failures[0][1]
@@ -10,8 +10,16 @@ class Env:
             "password": os.environ.get("PASSWORD", ""),
         }
 
+        self.artifact_root = os.environ.get("MIMIC_ARTIFACT_ROOT")
+        self.artifact_max_bytes = (
+            int(os.environ.get("MIMIC_ARTIFACT_MAX_BYTES", "0")) or None
+        )
+
         self.iv_version = os.environ.get("IV_VERSION", "3.1")
-        self.iv_url = f"https://physionet.org/files/mimiciv/{self.iv_version}"
+        self.iv_url = os.environ.get(
+            "IV_URL",
+            f"https://physionet.org/files/mimiciv/{self.iv_version}",
+        )
         self.iv_files = {
             "admissions": {
                 "name": "admissions.csv",
@@ -171,7 +179,10 @@ class Env:
         }
 
         self.cxr_version = os.environ.get("CXR_VERSION", "2.1.0")
-        self.cxr_url = f"https://physionet.org/files/mimic-cxr-jpg/{self.cxr_version}"
+        self.cxr_url = os.environ.get(
+            "CXR_URL",
+            f"https://physionet.org/files/mimic-cxr-jpg/{self.cxr_version}",
+        )
         self.cxr_files = {
             "chexpert": {
                 "name": "mimic-cxr-2.0.0-chexpert.csv",
@@ -0,0 +1,203 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Literal
+
+from .db import DuckDB, sql_literal
+from .sheet import Sheet, SheetQuery
+
+type FeatureAggregate = Literal[
+    "first",
+    "last",
+    "min",
+    "max",
+    "avg",
+    "sum",
+    "count",
+    "count_distinct",
+]
+
+_COUNT_AGGREGATES = {"count", "count_distinct"}
+
+
+class Feature:
+    def __init__(
+        self,
+        name: str,
+        sheet: Sheet,
+        column: str,
+        aggregate: FeatureAggregate,
+        *,
+        time_column: str | None = None,
+        condition: str | None = None,
+        anchor: Sheet | None = None,
+        anchor_column: str | None = None,
+        window: tuple[str, str] | None = None,
+    ) -> None:
+        if aggregate in {"first", "last"} and time_column is None:
+            msg = f"Feature '{name}' needs a time_column for aggregate '{aggregate}'."
+            raise ValueError(msg)
+
+        if window is not None and None in (time_column, anchor, anchor_column):
+            msg = (
+                f"Feature '{name}' needs a time_column, anchor and anchor_column "
+                "for a window."
+            )
+            raise ValueError(msg)
+
+        self.name = name
+        self.sheet = sheet
+        self.column = column
+        self.aggregate = aggregate
+        self.time_column = time_column
+        self.condition = condition
+        self.anchor = anchor
+        self.anchor_column = anchor_column
+        self.window = window
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, "
+            f"sheet={self.sheet.table_name!r}, column={self.column!r}, "
+            f"aggregate={self.aggregate!r}, time_column={self.time_column!r}, "
+            f"condition={self.condition!r}, "
+            f"anchor={self.anchor and self.anchor.table_name!r}, "
+            f"anchor_column={self.anchor_column!r}, window={self.window!r})"
+        )
+
+    @property
+    def is_count(self) -> bool:
+        return self.aggregate in _COUNT_AGGREGATES
+
+    @property
+    def anchor_key(self) -> tuple[str, str] | None:
+        if self.window is None or self.anchor is None or self.anchor_column is None:
+            return None
+
+        return self.anchor.table_name, self.anchor_column
+
+    def expression(self, anchor: str | None = None) -> str:
+        column = SheetQuery._parse_column(self.column)
+
+        match self.aggregate:
+            case "first":
+                expression = f"arg_min({column}, {self.time_column})"
+            case "last":
+                expression = f"arg_max({column}, {self.time_column})"
+            case "count_distinct":
+                expression = f"count(DISTINCT {column})"
+            case _:
+                expression = f"{self.aggregate}({column})"
+
+        conditions = [] if self.condition is None else [f"({self.condition})"]
+
+        if self.window is not None and self.time_column is not None:
+            time = f"CAST({SheetQuery._parse_column(self.time_column)} AS TIMESTAMP)"
+            start, end = (sql_literal(bound) for bound in self.window)
+            conditions.append(
+                f"{time} >= {anchor} + CAST({start} AS INTERVAL) "
+                f"AND {time} < {anchor} + CAST({end} AS INTERVAL)"
+            )
+
+        if conditions:
+            expression += f" FILTER (WHERE {' AND '.join(conditions)})"
+
+        return expression
+
+
+class FeatureSheet(Sheet):
+    def __init__(
+        self,
+        root: str | Path,
+        db: DuckDB,
+        table_name: str,
+        features: list[Feature],
+        key_column: str = "hadm_id",
+        *,
+        drop_table: bool = False,
+        skip_unchanged: bool = True,
+    ) -> None:
+        self.features = features
+        self.key_column = key_column
+
+        super().__init__(
+            root=root,
+            db=db,
+            table_name=table_name,
+            file_name=f"{table_name}.csv",
+            columns={key_column: "BIGINT"} | {f.name: "DOUBLE" for f in features},
+            id_column=key_column,
+            drop_table=drop_table,
+            skip_unchanged=skip_unchanged,
+        )
+
+    def _fingerprint(self) -> str:
+        identity = {
+            "key_column": self.key_column,
+            "features": [repr(f) for f in self.features],
+            "sources": {sheet.table_name: sheet.fingerprint for sheet in self.dependencies},
+        }
+
+        encoded = json.dumps(identity, sort_keys=True).encode()
+
+        return hashlib.sha256(encoded).hexdigest()
+
+    @property
+    def dependencies(self) -> list[Sheet]:
+        sheets = {id(f.sheet): f.sheet for f in self.features}
+        sheets |= {
+            id(f.anchor): f.anchor
+            for f in self.features
+            if f.anchor is not None and f.window is not None
+        }
+
+        return list(sheets.values())
+
+    def _create_table(self) -> None:
+        pass
+
+    def _groups(self) -> dict[str, list[Feature]]:
+        groups: dict[str, list[Feature]] = {}
+
+        for feature in self.features:
+            groups.setdefault(feature.sheet.table_name, []).append(feature)
+
+        return groups
+
+    def _aggregate(self, table_name: str, features: list[Feature]) -> SheetQuery:
+        anchors: dict[tuple[str, str], str] = {}
+
+        for f in features:
+            if f.anchor_key is not None and f.anchor_key not in anchors:
+                anchors[f.anchor_key] = f"anchor_{len(anchors)}"
+
+        return SheetQuery.feature_aggregate(
+            table_name,
+            self.key_column,
+            {
+                f.name: f.expression(anchors.get(f.anchor_key) if f.anchor_key else None)
+                for f in features
+            },
+            {alias: key for key, alias in anchors.items()},
+        )
+
+    def _load(self) -> None:
+        queries = [
+            self._aggregate(table_name, features)
+            for table_name, features in self._groups().items()
+        ]
+
+        columns = {
+            f.name: f"coalesce({f.name}, 0)" if f.is_count else f.name
+            for f in self.features
+        }
+
+        self.db.exec(
+            SheetQuery.create_feature_table(
+                self.table_name,
+                self.key_column,
+                queries,
+                columns,
+            )
+        )
+        self.db.exec(SheetQuery.create_index(self.table_name, self.key_column))
@@ -0,0 +1,144 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .db import DuckDB
+from .sheet import SheetQuery
+
+
+class ImageManifest:
+    def __init__(
+        self,
+        db: DuckDB,
+        root: str | Path,
+        table_name: str = "image_manifest",
+        max_workers: int = 32,
+    ) -> None:
+        self.db = db
+        self.root = Path(root)
+        self.table_name = table_name
+        self.max_workers = max_workers
+        self.fields = {
+            "image_path": "VARCHAR",
+            "size": "BIGINT",
+            "mtime_ns": "BIGINT",
+            "md5": "VARCHAR",
+        }
+
+    def _stat(self, file: str) -> tuple[int, int] | None:
+        try:
+            stat = (self.root / file).stat()
+        except OSError:
+            return None
+
+        return stat.st_size, stat.st_mtime_ns
+
+    def _md5(self, file: str, chunk_size: int = 1024 * 1024) -> str:
+        md5 = hashlib.md5(usedforsecurity=False)
+
+        with (self.root / file).open("rb") as fh:
+            while chunk := fh.read(chunk_size):
+                md5.update(chunk)
+
+        return md5.hexdigest()
+
+    def _entries(self) -> dict[str, tuple[int, int, str | None]]:
+        self.db.exec(
+            SheetQuery.create_fields_table(self.table_name, self.fields, "image_path")
+        )
+
+        rows = self.db.fetch_all(SheetQuery.from_table(self.table_name))
+
+        return {path: (size, mtime_ns, md5) for path, size, mtime_ns, md5 in rows}
+
+    def _stats(self, files: list[str]) -> list[tuple[int, int]] | None:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            stats = list(executor.map(self._stat, files))
+
+        if any(stat is None for stat in stats):
+            return None
+
+        return [stat for stat in stats if stat is not None]
+
+    def _hashes(
+        self,
+        files: list[str],
+        entries: dict[str, tuple[int, int, str | None]],
+    ) -> list[str] | None:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            hashes = list(executor.map(self._md5, files))
+
+        for file, md5 in zip(files, hashes, strict=True):
+            entry = entries.get(file)
+
+            if entry is not None and entry[2] is not None and entry[2] != md5:
+                return None
+
+        return hashes
+
+    def _record(self, rows: list[tuple[str, int, int, str | None]]) -> None:
+        df = pd.DataFrame(rows, columns=["image_path", "size", "mtime_ns", "md5"])
+
+        self.db.register("manifest_df", df)
+
+        try:
+            self.db.exec(SheetQuery.upsert(self.table_name, "manifest_df"))
+        finally:
+            self.db.unregister("manifest_df")
+
+    def check(self, files: list[str], *, verify: bool = False) -> bool:
+        entries = self._entries()
+        stats = self._stats(files)
+
+        if stats is None:
+            return False
+
+        changed = [
+            (file, stat)
+            for file, stat in zip(files, stats, strict=True)
+            if (entry := entries.get(file)) is None
+            or entry[:2] != stat
+            or (verify and entry[2] is None)
+        ]
+
+        if len(changed) == 0:
+            return True
+
+        hashes: list[str] | list[None] = [None] * len(changed)
+
+        if verify:
+            verified = self._hashes([file for file, _ in changed], entries)
+
+            if verified is None:
+                return False
+
+            hashes = verified
+
+        self._record(
+            [(file, *stat, md5) for (file, stat), md5 in zip(changed, hashes, strict=True)]
+        )
+
+        return True
+
+    def verify(self, files: list[str]) -> bool:
+        entries = self._entries()
+        stats = self._stats(files)
+
+        if stats is None:
+            return False
+
+        hashes = self._hashes(files, entries)
+
+        if hashes is None:
+            return False
+
+        self._record(
+            [
+                (file, *stat, md5)
+                for file, stat, md5 in zip(files, stats, hashes, strict=True)
+            ]
+        )
+
+        return True
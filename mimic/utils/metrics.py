@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Any
+
+
+class Metrics:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        profile_queries: bool = False,
+        max_events: int = 100_000,
+        worker_dir: str | Path | None = None,
+    ) -> None:
+        self.enabled = enabled
+        self.profile_queries = profile_queries
+        self.max_events = max_events
+        self.worker_dir = None if worker_dir is None else Path(worker_dir)
+
+        self.timers: dict[str, list[float]] = {}
+        self.counters: dict[str, float] = {}
+        self.events: list[dict[str, Any]] = []
+        self.profiles: list[dict[str, Any]] = []
+
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def timer(self, name: str, **args: Any) -> AbstractContextManager[None]:
+        if not self.enabled:
+            return nullcontext()
+
+        return self._timer(name, args)
+
+    @contextmanager
+    def _timer(self, name: str, args: dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter_ns()
+
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns(), args)
+
+    def record(self, name: str, start: int, end: int, args: dict[str, Any]) -> None:
+        elapsed = (end - start) / 1e9
+
+        with self._lock:
+            stats = self.timers.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+            if len(self.events) < self.max_events:
+                self.events.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": (start - self._origin) / 1e3,
+                        "dur": (end - start) / 1e3,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                        "args": args,
+                    }
+                )
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_profile(self, query: str, profile: str) -> None:
+        with self._lock:
+            self.profiles.append({"query": query, "profile": json.loads(profile)})
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            timers = {
+                name: {
+                    "count": count,
+                    "total_s": total,
+                    "mean_ms": total / count * 1e3,
+                    "max_ms": longest * 1e3,
+                }
+                for name, (count, total, longest) in sorted(self.timers.items())
+            }
+
+            return {"timers": timers, "counters": dict(sorted(self.counters.items()))}
+
+    def export_chrome_trace(self, path: str | Path) -> None:
+        with self._lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+        Path(path).write_text(json.dumps(trace))
+
+    def state(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "timers": dict(self.timers),
+                "counters": dict(self.counters),
+                "events": list(self.events),
+                "profiles": list(self.profiles),
+            }
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.part")
+        tmp.write_text(json.dumps(self.state(), default=str))
+        tmp.replace(path)
+
+    def attach_worker(self) -> None:
+        if not self.enabled or self.worker_dir is None:
+            return
+
+        self.reset()
+        self.worker_dir.mkdir(parents=True, exist_ok=True)
+
+        path = self.worker_dir / f"metrics-{os.getpid()}.json"
+        Finalize(self, self.save, args=(path,), exitpriority=10)
+
+    def merge(self, state: dict[str, Any]) -> None:
+        with self._lock:
+            for name, (count, total, longest) in state["timers"].items():
+                stats = self.timers.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], longest)
+
+            for name, value in state["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+            room = max(0, self.max_events - len(self.events))
+            self.events.extend(state["events"][:room])
+            self.profiles.extend(state["profiles"])
+
+    def merge_workers(self, *, remove: bool = True) -> int:
+        if self.worker_dir is None:
+            return 0
+
+        paths = sorted(self.worker_dir.glob("metrics-*.json"))
+
+        for path in paths:
+            self.merge(json.loads(path.read_text()))
+
+            if remove:
+                path.unlink()
+
+        return len(paths)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.events.clear()
+            self.profiles.clear()
@@ -1,14 +1,20 @@
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any
 
 import joblib
 import pandas as pd
+from sklearn.base import clone
 from sklearn.preprocessing import MinMaxScaler, OrdinalEncoder, StandardScaler
 
+from .db import sql_literal
+
 
 class Scaler:
     def __init__(self, scaler: Any, transform_columns: list[str]) -> None:
-        self.scaler = scaler
+        self.scaler: Any = scaler
         self.transform_columns = transform_columns
 
     def _check_missing(self, df: pd.DataFrame) -> None:
@@ -22,6 +28,18 @@ class Scaler:
 
         self.scaler.fit(df[self.transform_columns])
 
+    def reset(self) -> None:
+        self.scaler = clone(self.scaler)
+
+    def partial_fit(self, df: pd.DataFrame) -> None:
+        self._check_missing(df)
+
+        if not hasattr(self.scaler, "partial_fit"):
+            msg = f"{self.__class__.__name__} can not be fitted in chunks."
+            raise TypeError(msg)
+
+        self.scaler.partial_fit(df[self.transform_columns])
+
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
         self._check_missing(df)
 
@@ -78,3 +96,136 @@ class DBOrdinalEncoder(Scaler):
         scaler = OrdinalEncoder(**kwargs)
 
         super().__init__(scaler, transform_columns)
+
+
+def _double(value: float) -> str:
+    return f"{sql_literal(repr(float(value)))}::DOUBLE"
+
+
+class SQLScaler(ABC):
+    def __init__(
+        self,
+        transform_columns: list[str],
+        condition: str | None = None,
+    ) -> None:
+        self.transform_columns = transform_columns
+        self.condition = condition
+        self.params: dict[str, list[Any]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}("
+            f"transform_columns={self.transform_columns!r}, condition={self.condition!r})"
+        )
+
+    @staticmethod
+    def _quote(column: str) -> str:
+        return f'"{column}"'
+
+    @abstractmethod
+    def _column_aggregates(self, column: str) -> list[str]:
+        pass
+
+    @abstractmethod
+    def _column_expression(self, value: str, params: list[Any]) -> str:
+        pass
+
+    def aggregates(self) -> list[str]:
+        return [
+            aggregate
+            for column in self.transform_columns
+            for aggregate in self._column_aggregates(column)
+        ]
+
+    def set_params(self, values: Sequence[Any]) -> None:
+        values = list(values)
+        size = len(values) // len(self.transform_columns)
+
+        self.params = {
+            column: values[i * size : (i + 1) * size]
+            for i, column in enumerate(self.transform_columns)
+        }
+
+    def expression(self, column: str, value: str) -> str:
+        if column not in self.params:
+            msg = f"{self.__class__.__name__} is not fitted for column '{column}'."
+            raise ValueError(msg)
+
+        return self._column_expression(value, self.params[column])
+
+    def save(self, root: str | Path) -> None:
+        scaler_root = Path(root) / "scaler"
+        scaler_root.mkdir(parents=True, exist_ok=True)
+
+        file_name = scaler_root / f"{self.__class__.__name__}.json"
+
+        file_name.write_text(json.dumps(self.params))
+
+    def load(self, root: str | Path) -> None:
+        scaler_root = Path(root) / "scaler"
+        file_name = scaler_root / f"{self.__class__.__name__}.json"
+
+        if not file_name.exists():
+            return
+
+        self.params = json.loads(file_name.read_text())
+
+
+class SQLStandardScaler(SQLScaler):
+    def _column_aggregates(self, column: str) -> list[str]:
+        column = self._quote(column)
+        finite = f"FILTER (isfinite({column}))"
+        return [f"avg({column}) {finite}", f"stddev_pop({column}) {finite}"]
+
+    def set_params(self, values: Sequence[Any]) -> None:
+        super().set_params([None if v is None else float(v) for v in values])
+
+    def _column_expression(self, value: str, params: list[Any]) -> str:
+        mean, std = params
+        return f"(({value}) - {_double(mean or 0.0)}) / {_double(std or 1.0)}"
+
+
+class SQLMinMaxScaler(SQLScaler):
+    def __init__(
+        self,
+        transform_columns: list[str],
+        condition: str | None = None,
+        feature_range: tuple[float, float] = (0.0, 1.0),
+    ) -> None:
+        super().__init__(transform_columns, condition)
+
+        self.feature_range = feature_range
+
+    def __repr__(self) -> str:
+        return f"{super().__repr__()[:-1]}, feature_range={self.feature_range!r})"
+
+    def _column_aggregates(self, column: str) -> list[str]:
+        column = self._quote(column)
+        finite = f"FILTER (isfinite({column}))"
+        return [f"min({column}) {finite}", f"max({column}) {finite}"]
+
+    def set_params(self, values: Sequence[Any]) -> None:
+        super().set_params([None if v is None else float(v) for v in values])
+
+    def _column_expression(self, value: str, params: list[Any]) -> str:
+        low, high = params
+        low = low or 0.0
+        scale = (high - low) if high is not None and high != low else 1.0
+        a, b = self.feature_range
+
+        return (
+            f"(({value}) - {_double(low)}) / {_double(scale)} "
+            f"* {_double(b - a)} + {_double(a)}"
+        )
+
+
+class SQLOrdinalEncoder(SQLScaler):
+    def _column_aggregates(self, column: str) -> list[str]:
+        column = self._quote(column)
+        return [f"list(DISTINCT {column} ORDER BY {column}) FILTER ({column} IS NOT NULL)"]
+
+    def _column_expression(self, value: str, params: list[Any]) -> str:
+        (categories,) = params
+        categories_str = ",".join(sql_literal(c) for c in categories or [])
+
+        return f"list_position([{categories_str}], {value}) - 1"
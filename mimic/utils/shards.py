@@ -0,0 +1,117 @@
+import io
+import tarfile
+from collections.abc import Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+
+class ShardWriter:
+    def __init__(
+        self,
+        root: str | Path,
+        prefix: str = "shard",
+        max_count: int = 2000,
+        max_bytes: int = 1024**3,
+    ) -> None:
+        self.root = Path(root)
+        self.prefix = prefix
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.shards: list[dict[str, Any]] = []
+
+        self._tar: tarfile.TarFile | None = None
+        self._path: Path | None = None
+        self._count = 0
+        self._bytes = 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @staticmethod
+    def _part(path: Path) -> Path:
+        return path.with_name(f"{path.name}.part")
+
+    def _open(self) -> tarfile.TarFile:
+        self._path = self.root / f"{self.prefix}-{len(self.shards):06d}.tar"
+        self._tar = tarfile.open(self._part(self._path), "w")  # noqa: SIM115
+        self._count = 0
+        self._bytes = 0
+
+        return self._tar
+
+    def _finish(self) -> None:
+        if self._tar is None or self._path is None:
+            return
+
+        self._tar.close()
+        self._part(self._path).replace(self._path)
+        self.shards.append({"name": self._path.name, "count": self._count})
+        self._tar = None
+
+    def write(self, key: str, files: dict[str, bytes]) -> None:
+        tar = self._tar or self._open()
+
+        for ext, data in files.items():
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            self._bytes += len(data)
+
+        self._count += 1
+
+        if self._count >= self.max_count or self._bytes >= self.max_bytes:
+            self._finish()
+
+    def close(self) -> list[dict[str, Any]]:
+        if self._tar is not None:
+            self._finish()
+
+        return self.shards
+
+    def abort(self) -> None:
+        if self._tar is not None and self._path is not None:
+            self._tar.close()
+            self._part(self._path).unlink(missing_ok=True)
+            self._tar = None
+
+
+def read_shard(path: str | Path) -> Iterator[tuple[str, dict[str, bytes]]]:
+    key: str | None = None
+    files: dict[str, bytes] = {}
+
+    with tarfile.open(path, "r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+
+            name, _, ext = member.name.rpartition(".")
+
+            if name != key and key is not None:
+                yield key, files
+                files = {}
+
+            data = tar.extractfile(member)
+
+            if data is None:
+                msg = f"Can not read '{member.name}' from shard '{path}'."
+                raise ValueError(msg)
+
+            key = name
+            files[ext] = data.read()
+
+    if key is not None:
+        yield key, files
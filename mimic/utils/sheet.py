@@ -1,17 +1,94 @@
-from collections.abc import Callable
+import hashlib
+import json
+import re
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager
 from pathlib import Path
 from typing import Any, Literal
 
 import pandas as pd
 
-from .db import DuckDB, Query
-from .scaler import Scaler
+from .db import DuckDB, Query, sql_literal
+from .metrics import Metrics
+from .scaler import Scaler, SQLScaler
 
 type SheetTransformCallable = Callable[
     [DuckDB, pd.DataFrame],
     SheetSubset | list[SheetSubset],
 ]
 
+type CacheFormat = Literal["csv", "parquet"]
+
+_DUCKDB_TYPES = {
+    "string": "VARCHAR",
+    "str": "VARCHAR",
+    "object": "VARCHAR",
+    "category": "VARCHAR",
+    "float": "DOUBLE",
+    "float64": "DOUBLE",
+    "Float64": "DOUBLE",
+    "float32": "FLOAT",
+    "Float32": "FLOAT",
+    "int": "BIGINT",
+    "int64": "BIGINT",
+    "Int64": "BIGINT",
+    "int32": "INTEGER",
+    "Int32": "INTEGER",
+    "int16": "SMALLINT",
+    "Int16": "SMALLINT",
+    "int8": "TINYINT",
+    "Int8": "TINYINT",
+    "bool": "BOOLEAN",
+    "boolean": "BOOLEAN",
+    "datetime64[ns]": "TIMESTAMP",
+}
+
+# Same markers pandas.read_csv treats as missing by default.
+_NULL_STRINGS = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+FINGERPRINT_TABLE = "sheet_fingerprints"
+
+
+def callable_identity(fn: Callable | None) -> str | None:
+    if fn is None:
+        return None
+
+    identity = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+    code = getattr(fn, "__code__", None)
+
+    if code is not None:
+        code_hash = hashlib.sha256(code.co_code + repr(code.co_consts).encode())
+        identity += f":{code_hash.hexdigest()[:16]}"
+
+    return identity
+
+
+def _duckdb_type(dtype: Any) -> str:
+    name = getattr(dtype, "__name__", str(dtype))
+
+    return _DUCKDB_TYPES.get(name, name)
+
 
 class SheetSubset:
     def __init__(self, df: pd.DataFrame, *, train: bool = True) -> None:
@@ -26,6 +103,14 @@ class SheetSubset:
             self.df = s.transform(self.df)
         return self.df
 
+    def partial_fit(self, scaler: Scaler) -> None:
+        scaler.partial_fit(self.df)
+
+    def transform(self, scaler: list[Scaler]) -> pd.DataFrame:
+        for s in scaler:
+            self.df = s.transform(self.df)
+        return self.df
+
 
 class Sheet:
     def __init__(
@@ -39,10 +124,16 @@ class Sheet:
         scaler: list[Scaler] | None = None,
         table_fields: dict[str, str] | None = None,
         transform: SheetTransformCallable | None = None,
+        expressions: dict[str, str] | None = None,
+        sql_scaler: list[SQLScaler] | None = None,
         *,
         drop_table: bool = True,
         force_insert: bool = False,
         train: bool = True,
+        cache_format: CacheFormat = "csv",
+        skip_unchanged: bool = False,
+        chunk_size: int | None = None,
+        metrics: Metrics | None = None,
     ) -> None:
         self.root = Path(root)
         self.db = db
@@ -52,9 +143,15 @@ class Sheet:
         self.id_column = id_column
         self.scaler = scaler
         self.transform = transform
+        self.expressions = expressions or {}
+        self.sql_scaler = sql_scaler or []
         self.drop_table = drop_table
         self.force_insert = force_insert
         self.train = train
+        self.cache_format: CacheFormat = cache_format
+        self.skip_unchanged = skip_unchanged
+        self.chunk_size = chunk_size
+        self.metrics = metrics or Metrics(enabled=False)
 
         if table_fields is None:
             table_fields = columns
@@ -64,21 +161,136 @@ class Sheet:
         self.root.mkdir(parents=True, exist_ok=True)
 
         self.source_csv_path = self.root / self.file_name
+        self.source_gz_path = self.root / f"{self.file_name}.gz"
+
+        self.fingerprint = self._fingerprint()
+        self.unchanged = self.skip_unchanged and self._is_unchanged()
+
+        if not self.unchanged:
+            if self.drop_table:
+                self._drop_table()
 
-        if self.drop_table:
-            self._drop_table()
+            self._create_table()
 
-        self._create_table()
         self._load_scaler()
 
+    def _timer(self, stage: str) -> AbstractContextManager[None]:
+        return self.metrics.timer(f"sheet.{self.table_name}.{stage}")
+
+    def _fingerprint(self) -> str:
+        sources = [
+            (path.name, path.stat().st_size, path.stat().st_mtime_ns)
+            for path in (self.source_csv_path, self.source_gz_path)
+            if path.exists()
+        ]
+
+        scalers = [
+            (type(s).__qualname__, s.transform_columns, repr(s.scaler))
+            for s in self.scaler or []
+        ]
+        scalers += [repr(s) for s in self.sql_scaler]
+
+        identity = {
+            "sources": sources,
+            "columns": {col: str(dtype) for col, dtype in self.columns.items()},
+            "table_fields": self.table_fields,
+            "expressions": self.expressions,
+            "id_column": self.id_column,
+            "transform": callable_identity(self.transform),
+            "scaler": scalers,
+            "train": self.train,
+        }
+
+        encoded = json.dumps(identity, sort_keys=True, default=str).encode()
+
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _table_exists(self, table_name: str) -> bool:
+        res = self.db.fetch_one(SheetQuery.table_exists(table_name))
+
+        return res is not None and res[0] > 0
+
+    def _is_unchanged(self) -> bool:
+        tables = (FINGERPRINT_TABLE, self.table_name)
+
+        if not all(self._table_exists(table) for table in tables):
+            return False
+
+        res = self.db.fetch_one(SheetQuery.find_fingerprint(self))
+
+        return res is not None and res[0] == self.fingerprint
+
+    def _save_fingerprint(self) -> None:
+        self.db.exec(SheetQuery.create_fingerprint_table())
+        self.db.exec(SheetQuery.save_fingerprint(self))
+
+    @property
+    def dependencies(self) -> list["Sheet"]:
+        return []
+
+    @property
+    def cache_path(self) -> Path:
+        file_name = self.file_name
+
+        if self.cache_format == "parquet":
+            file_name = f"{Path(self.file_name).stem}.parquet"
+
+        return self.root / "transformed" / file_name
+
+    @property
+    def cache_fingerprint_path(self) -> Path:
+        return self.cache_path.with_name(f"{self.cache_path.name}.fingerprint")
+
+    def _is_cache_current(self) -> bool:
+        try:
+            return self.cache_fingerprint_path.read_text() == self.fingerprint
+        except FileNotFoundError:
+            return False
+
+    @property
+    def source_path(self) -> Path:
+        if self.source_csv_path.exists() or not self.source_gz_path.exists():
+            return self.source_csv_path
+
+        return self.source_gz_path
+
     def _load_scaler(self) -> None:
+        scaler_root = self.root / self.table_name
+
+        for s in self.sql_scaler:
+            s.load(scaler_root)
+
         if self.scaler is None:
             return
 
-        scaler_root = self.root / self.table_name
         for s in self.scaler:
             s.load(scaler_root)
 
+    def _fit_sql_scaler(self, source: str, *, apply_expressions: bool) -> None:
+        if not self.train:
+            return
+
+        scaler_root = self.root / self.table_name
+
+        for i, scaler in enumerate(self.sql_scaler):
+            fields = SheetQuery.select_fields(
+                self,
+                source,
+                apply_expressions=apply_expressions,
+                sql_scaler=self.sql_scaler[:i],
+            )
+
+            with self._timer("sql_scaler"):
+                res = self.db.fetch_one(
+                    SheetQuery.aggregate(fields, scaler.aggregates(), scaler.condition)
+                )
+
+            if res is None:
+                continue
+
+            scaler.set_params(res)
+            scaler.save(scaler_root)
+
     def _create_table(self) -> None:
         query = SheetQuery.create_table(self)
         self.db.exec(query)
@@ -87,21 +299,37 @@ class Sheet:
         query = SheetQuery.drop_table(self)
         self.db.exec(query)
 
-    def _insert_data(self, csv_path: str | Path) -> None:
-        query = SheetQuery.copy_csv(self, csv_path)
-        self.db.exec(query)
+        if self._table_exists(FINGERPRINT_TABLE):
+            self.db.exec(SheetQuery.delete_fingerprint(self))
+
+    def _insert_data(self, path: str | Path) -> None:
+        if Path(path).suffix == ".parquet":
+            query = SheetQuery.copy_parquet(self, path)
+        else:
+            query = SheetQuery.copy_csv(self, path)
+
+        with self._timer("insert"):
+            self.db.exec(query)
+
+    def _write_cache(self, source: str, *, apply_expressions: bool) -> None:
+        (self.root / "transformed").mkdir(parents=True, exist_ok=True)
+        self.cache_fingerprint_path.unlink(missing_ok=True)
+
+        self._fit_sql_scaler(source, apply_expressions=apply_expressions)
+
+        query = SheetQuery.select_fields(self, source, apply_expressions=apply_expressions)
+
+        with self._timer("write_cache"):
+            self.db.exec(SheetQuery.copy_to(query, self.cache_path, self.cache_format))
+
+        self.cache_fingerprint_path.write_text(self.fingerprint)
 
     def _merge_subsets(self, subsets: list[SheetSubset]) -> pd.DataFrame:
         dataframes = [subset.df for subset in subsets]
 
         return pd.concat(dataframes, ignore_index=True)
 
-    def _transform_data(
-        self,
-        df: pd.DataFrame,
-    ) -> pd.DataFrame:
-        scaler_root = self.root / self.table_name
-
+    def _transform_subsets(self, df: pd.DataFrame) -> list[SheetSubset]:
         subsets = [SheetSubset(df, train=self.train)]
 
         if self.transform is not None:
@@ -110,37 +338,216 @@ class Sheet:
             if not isinstance(subsets, list):
                 subsets = [subsets]
 
+        return subsets
+
+    def _transform_data(
+        self,
+        df: pd.DataFrame,
+    ) -> pd.DataFrame:
+        scaler_root = self.root / self.table_name
+
+        with self._timer("transform"):
+            subsets = self._transform_subsets(df)
+
         if self.scaler is not None:
-            for subset in subsets:
-                subset.fit_transform(scaler_root, self.scaler)
+            with self._timer("scaler"):
+                for subset in subsets:
+                    subset.fit_transform(scaler_root, self.scaler)
 
         return self._merge_subsets(subsets)
 
-    def load_csv(self) -> None:
-        csv_path = self.root / "transformed" / self.file_name
+    def _read_chunks(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(
+            self.source_path,
+            usecols=list(self.columns.keys()),
+            dtype=self.columns,
+            chunksize=chunk_size,
+        ) as reader:
+            for df in reader:
+                if self.id_column not in df.columns:
+                    msg = f"CSV file must contain an '{self.id_column}' column."
+                    raise ValueError(msg)
 
-        if csv_path.exists() and not self.force_insert:
-            if self.drop_table:
-                self._insert_data(csv_path)
+                yield self._apply_expressions(df)
+
+    def _fit_chunked(self, chunk_size: int) -> None:
+        if self.scaler is None:
             return
 
-        df = pd.read_csv(
-            self.source_csv_path,
-            usecols=list(self.columns.keys()),
-            dtype=self.columns,
-        )
+        scaler_root = self.root / self.table_name
+
+        for i, scaler in enumerate(self.scaler):
+            fitted = False
+
+            for df in self._read_chunks(chunk_size):
+                for subset in self._transform_subsets(df):
+                    if not subset.train:
+                        continue
+
+                    subset.transform(self.scaler[:i])
+
+                    if not fitted:
+                        scaler.reset()
+                        fitted = True
+
+                    subset.partial_fit(scaler)
+
+            if fitted:
+                scaler.save(scaler_root)
+
+    def _load_chunked(self, chunk_size: int) -> None:
+        self._fit_chunked(chunk_size)
+
+        staging_table = f"{self.table_name}_staging"
+
+        self.db.exec(SheetQuery.drop_table(self, staging_table))
+
+        try:
+            for i, df in enumerate(self._read_chunks(chunk_size)):
+                self.metrics.count(f"sheet.{self.table_name}.rows", len(df))
+
+                with self._timer("transform"):
+                    subsets = self._transform_subsets(df)
+
+                if self.scaler is not None:
+                    with self._timer("scaler"):
+                        for subset in subsets:
+                            subset.transform(self.scaler)
+
+                self.db.register("transformed_df", self._merge_subsets(subsets))
+
+                try:
+                    if i == 0:
+                        query = SheetQuery.create_temp_table(
+                            staging_table,
+                            SheetQuery.select_fields(
+                                self,
+                                "transformed_df",
+                                apply_expressions=False,
+                                sql_scaler=[],
+                            ),
+                        )
+                    else:
+                        query = SheetQuery.insert_select(
+                            self,
+                            "transformed_df",
+                            staging_table,
+                            apply_expressions=False,
+                            sql_scaler=[],
+                        )
+
+                    self.db.exec(query)
+                finally:
+                    self.db.unregister("transformed_df")
+
+            self._write_cache(staging_table, apply_expressions=False)
+        finally:
+            self.db.exec(SheetQuery.drop_table(self, staging_table))
+
+    def _is_empty(self) -> bool:
+        res = self.db.fetch_one(SheetQuery.count(self))
+
+        return res is None or res[0] == 0
+
+    def _check_fields(self) -> None:
+        if self.id_column not in self.columns:
+            msg = f"CSV file must contain an '{self.id_column}' column."
+            raise ValueError(msg)
+
+        missing = [
+            field
+            for field in self.table_fields
+            if field not in self.columns and field not in self.expressions
+        ]
+
+        if missing:
+            msg = f"Fields {missing} need a Python transform or an expression."
+            raise ValueError(msg)
+
+    def _apply_expressions(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not self.expressions:
+            return df
+
+        self.db.register("source_df", df)
+
+        try:
+            return self.db.fetch_df(SheetQuery.select_expressions(self, "source_df"))
+        finally:
+            self.db.unregister("source_df")
+
+    @property
+    def needs_pandas(self) -> bool:
+        return self.transform is not None or self.scaler is not None
+
+    def _load_native(self) -> None:
+        self._check_fields()
+
+        if not (self.drop_table or self.force_insert or self._is_empty()):
+            return
+
+        source = SheetQuery.csv_source(self, self.source_path)
+
+        self._fit_sql_scaler(source, apply_expressions=True)
+
+        with self._timer("insert"):
+            self.db.exec(SheetQuery.insert_select(self, source))
+
+    def _read_csv(self) -> pd.DataFrame:
+        with self._timer("read_csv"):
+            df = pd.read_csv(
+                self.source_path,
+                usecols=list(self.columns.keys()),
+                dtype=self.columns,
+            )
+
+        self.metrics.count(f"sheet.{self.table_name}.rows", len(df))
 
         if self.id_column not in df.columns:
             msg = f"CSV file must contain an '{self.id_column}' column."
             raise ValueError(msg)
 
-        df = self._transform_data(df)
+        df = self._apply_expressions(df)
 
-        (self.root / "transformed").mkdir(parents=True, exist_ok=True)
+        return self._transform_data(df)
+
+    def load_csv(self) -> None:
+        if self.unchanged:
+            return
+
+        with self._timer("load"):
+            self._load()
 
-        df[self.table_fields.keys()].to_csv(csv_path, index=False)
+        self._save_fingerprint()
 
-        self._insert_data(csv_path)
+    def _load(self) -> None:
+        if not self.needs_pandas and self.cache_format == "csv":
+            self._load_native()
+            return
+
+        cache_path = self.cache_path
+
+        if cache_path.exists() and self._is_cache_current() and not self.force_insert:
+            if self.drop_table:
+                self._insert_data(cache_path)
+            return
+
+        if self.needs_pandas and self.chunk_size is not None:
+            self._load_chunked(self.chunk_size)
+        elif self.needs_pandas:
+            df = self._read_csv()
+
+            self.db.register("transformed_df", df)
+
+            try:
+                self._write_cache("transformed_df", apply_expressions=False)
+            finally:
+                self.db.unregister("transformed_df")
+        else:
+            self._check_fields()
+            source = SheetQuery.csv_source(self, self.source_path)
+            self._write_cache(source, apply_expressions=True)
+
+        self._insert_data(cache_path)
 
 
 class SheetJoinCondition:
@@ -175,11 +582,32 @@ class SheetJoinCondition:
 
 
 class SheetQuery(Query):
-    def __init__(self, query: str | list[str]) -> None:
+    def __init__(
+        self,
+        query: str | list[str],
+        params: dict[str, Any] | None = None,
+    ) -> None:
         if isinstance(query, str):
             query = [query]
 
         self.query = query
+        self.params = params or {}
+
+    def parameters(self) -> dict[str, Any]:
+        return self.params
+
+    @staticmethod
+    def _row_id_condition(row_id: list[int]) -> tuple[str, dict[str, Any]]:
+        rows = sorted({int(r) for r in row_id})
+
+        if len(rows) > 1 and rows[-1] - rows[0] == len(rows) - 1:
+            condition = "row_num BETWEEN $row_start AND $row_end"
+            return condition, {"row_start": rows[0], "row_end": rows[-1]}
+
+        params = {f"row_{i}": r for i, r in enumerate(rows)}
+        condition = f"row_num IN ({','.join(f'${name}' for name in params)})"
+
+        return condition, params
 
     @staticmethod
     def _parse_column(column: str) -> str:
@@ -193,6 +621,7 @@ class SheetQuery(Query):
     def _add_query(
         self,
         query: str | list[str],
+        params: dict[str, Any] | None = None,
         *,
         inplace: bool = True,
     ) -> "SheetQuery":
@@ -201,9 +630,10 @@ class SheetQuery(Query):
 
         if inplace:
             self.query.append(query)
+            self.params.update(params or {})
             return self
 
-        sq = SheetQuery(self.query.copy())
+        sq = SheetQuery(self.query.copy(), {**self.params, **(params or {})})
         sq.query.append(query)
 
         return sq
@@ -211,6 +641,7 @@ class SheetQuery(Query):
     def copy(self) -> "SheetQuery":
         sq = SheetQuery.empty()
         sq.query = self.query.copy()
+        sq.params = self.params.copy()
 
         return sq
 
@@ -221,6 +652,7 @@ class SheetQuery(Query):
         self,
         condition: str | list[str],
         operator: Literal["and", "or"] = "and",
+        params: dict[str, Any] | None = None,
         *,
         inplace: bool = True,
     ) -> "SheetQuery":
@@ -238,7 +670,7 @@ class SheetQuery(Query):
                 query.append(f"WHERE {c}")
                 contains_where = True
 
-        return self._add_query(query, inplace=inplace)
+        return self._add_query(query, params, inplace=inplace)
 
     def find_by_row_id(
         self,
@@ -250,28 +682,66 @@ class SheetQuery(Query):
             row_id = [row_id]
 
         query = f"SELECT * FROM ({' '.join(self.query)})"
-        condition = f"row_num IN ({','.join(map(str, row_id))})"
+        condition, params = SheetQuery._row_id_condition(row_id)
+
+        if inplace:
+            self.query = [query]
+            return self.where(condition, params=params, inplace=inplace)
+        return SheetQuery(query, self.params.copy()).where(
+            condition,
+            params=params,
+            inplace=inplace,
+        )
+
+    def find_by_row_range(
+        self,
+        start: int,
+        end: int,
+        *,
+        inplace: bool = True,
+    ) -> "SheetQuery":
+        query = f"SELECT * FROM ({' '.join(self.query)})"
+        condition = "row_num >= $row_start AND row_num < $row_end"
+        params = {"row_start": int(start), "row_end": int(end)}
 
         if inplace:
             self.query = [query]
-            return self.where(condition, inplace=inplace)
-        return SheetQuery(query).where(condition, inplace=inplace)
+            return self.where(condition, params=params, inplace=inplace)
+        return SheetQuery(query, self.params.copy()).where(
+            condition,
+            params=params,
+            inplace=inplace,
+        )
+
+    def filter_row_id(
+        self,
+        row_id: int | list[int],
+        *,
+        inplace: bool = True,
+    ) -> "SheetQuery":
+        if isinstance(row_id, int):
+            row_id = [row_id]
+
+        condition, params = SheetQuery._row_id_condition(row_id)
+
+        return self.where(condition, params=params, inplace=inplace)
 
     def find_by_id(
         self,
         column_id: str,
         ids: str | list[str],
         *,
+        column_type: str | None = None,
         inplace: bool = True,
     ) -> "SheetQuery":
         if isinstance(ids, str):
             ids = [ids]
 
-        cols = ",".join(f"'{col}'" for col in ids)
+        name = re.sub(r"\W", "_", column_id) + "_ids"
+        values = f"${name}" if column_type is None else f"CAST(${name} AS {column_type}[])"
+        condition = f"{SheetQuery._parse_column(column_id)} IN (SELECT unnest({values}))"
 
-        condition = f"{SheetQuery._parse_column(column_id)} IN ({cols})"
-
-        return self.where(condition, inplace=inplace)
+        return self.where(condition, params={name: list(ids)}, inplace=inplace)
 
     def join(
         self,
@@ -314,6 +784,16 @@ class SheetQuery(Query):
 
         return SheetQuery(query)
 
+    @staticmethod
+    def from_table(
+        table_name: str,
+        columns: str | list[str] = "*",
+    ) -> "SheetQuery":
+        if isinstance(columns, list):
+            columns = ",".join(SheetQuery._parse_column(col) for col in columns)
+
+        return SheetQuery(f"SELECT {columns} FROM {table_name}")
+
     @staticmethod
     def count(
         sheet: Sheet,
@@ -341,6 +821,51 @@ class SheetQuery(Query):
 
         return SheetQuery(query)
 
+    @staticmethod
+    def update_in(
+        sheet: Sheet,
+        column: str,
+        id_column: str,
+        query: "SheetQuery",
+    ) -> "SheetQuery":
+        update_query = (
+            f"UPDATE {sheet.table_name} SET {SheetQuery._parse_column(column)}="
+            f"{SheetQuery._parse_column(id_column)} IN ({' '.join(query.query)})"
+        )
+
+        return SheetQuery(update_query, query.params.copy())
+
+    @staticmethod
+    def sample_by_label(
+        queries: dict[str, tuple["SheetQuery", float]],
+        id_column: str,
+        seed: int = 0,
+    ) -> "SheetQuery":
+        column = SheetQuery._parse_column(id_column)
+        params: dict[str, Any] = {}
+        subqueries = []
+
+        for label, (query, proportion) in queries.items():
+            params.update(query.params)
+            subqueries.append(
+                f"SELECT {column}, {sql_literal(label)} AS label, "
+                f"{float(proportion)} AS proportion FROM ({' '.join(query.query)})"
+            )
+
+        ranked = (
+            f"SELECT {column}, proportion, "
+            f"row_number() OVER (PARTITION BY label "
+            f"ORDER BY hash({column}, {int(seed)}), {column}) AS rn, "
+            f"count(*) OVER (PARTITION BY label) AS total "
+            f"FROM ({' UNION ALL '.join(subqueries)})"
+        )
+        sample_query = (
+            f"SELECT DISTINCT {column} FROM ({ranked}) "
+            "WHERE rn <= floor(total * proportion)"
+        )
+
+        return SheetQuery(sample_query, params)
+
     @staticmethod
     def create_table(sheet: Sheet) -> "SheetQuery":
         columns_str = ",".join(
@@ -352,8 +877,105 @@ class SheetQuery(Query):
         return SheetQuery(create_query)
 
     @staticmethod
-    def drop_table(sheet: Sheet) -> "SheetQuery":
-        drop_query = f"DROP TABLE IF EXISTS {sheet.table_name}"
+    def create_index(table_name: str, column: str) -> "SheetQuery":
+        index_query = f"CREATE INDEX {table_name}_{column}_idx ON {table_name} ({column})"
+
+        return SheetQuery(index_query)
+
+    @staticmethod
+    def create_table_as(table_name: str, query: "SheetQuery") -> "SheetQuery":
+        create_query = (
+            f"CREATE OR REPLACE TABLE {table_name} AS "
+            f"SELECT * FROM ({' '.join(query.query)}) ORDER BY row_num"
+        )
+
+        return SheetQuery(create_query)
+
+    @staticmethod
+    def table_exists(table_name: str) -> "SheetQuery":
+        exists_query = (
+            "SELECT COUNT(*) FROM information_schema.tables "
+            f"WHERE table_name = '{table_name}'"
+        )
+
+        return SheetQuery(exists_query)
+
+    @staticmethod
+    def column_type(table_names: list[str], column: str) -> "SheetQuery":
+        type_query = (
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name IN (SELECT unnest($table_names)) "
+            "AND column_name = $column_name LIMIT 1"
+        )
+
+        return SheetQuery(type_query, {"table_names": table_names, "column_name": column})
+
+    @staticmethod
+    def create_fingerprint_table() -> "SheetQuery":
+        create_query = (
+            f"CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} "
+            "(table_name VARCHAR PRIMARY KEY, fingerprint VARCHAR, loaded_at TIMESTAMP)"
+        )
+
+        return SheetQuery(create_query)
+
+    @staticmethod
+    def create_fields_table(
+        table_name: str,
+        fields: dict[str, str],
+        primary_key: str | None = None,
+    ) -> "SheetQuery":
+        columns_str = ",".join(
+            f"{col} {dtype}{' PRIMARY KEY' if col == primary_key else ''}"
+            for col, dtype in fields.items()
+        )
+        create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns_str})"
+
+        return SheetQuery(create_query)
+
+    @staticmethod
+    def upsert(table_name: str, source: str) -> "SheetQuery":
+        upsert_query = f"INSERT OR REPLACE INTO {table_name} SELECT * FROM {source}"
+
+        return SheetQuery(upsert_query)
+
+    @staticmethod
+    def find_fingerprint(sheet: Sheet) -> "SheetQuery":
+        find_query = (
+            f"SELECT fingerprint FROM {FINGERPRINT_TABLE} "
+            f"WHERE table_name = '{sheet.table_name}'"
+        )
+
+        return SheetQuery(find_query)
+
+    @staticmethod
+    def save_fingerprint(sheet: Sheet) -> "SheetQuery":
+        save_query = (
+            f"INSERT OR REPLACE INTO {FINGERPRINT_TABLE} "
+            f"VALUES ('{sheet.table_name}', '{sheet.fingerprint}', current_timestamp)"
+        )
+
+        return SheetQuery(save_query)
+
+    @staticmethod
+    def delete_fingerprint(sheet: Sheet) -> "SheetQuery":
+        delete_query = (
+            f"DELETE FROM {FINGERPRINT_TABLE} WHERE table_name = '{sheet.table_name}'"
+        )
+
+        return SheetQuery(delete_query)
+
+    @staticmethod
+    def create_temp_table(table_name: str, query: "SheetQuery") -> "SheetQuery":
+        create_query = (
+            f"CREATE OR REPLACE TEMP TABLE {table_name} AS {' '.join(query.query)}"
+        )
+
+        return SheetQuery(create_query)
+
+    @staticmethod
+    def drop_table(sheet: Sheet, table_name: str | None = None) -> "SheetQuery":
+        drop_query = f"DROP TABLE IF EXISTS {table_name or sheet.table_name}"
 
         return SheetQuery(drop_query)
 
@@ -363,6 +985,182 @@ class SheetQuery(Query):
 
         return SheetQuery(copy_query)
 
+    @staticmethod
+    def copy_parquet(sheet: Sheet, parquet_path: str | Path) -> "SheetQuery":
+        copy_query = f"COPY {sheet.table_name} FROM '{parquet_path}' (FORMAT PARQUET)"
+
+        return SheetQuery(copy_query)
+
+    @staticmethod
+    def csv_source(sheet: Sheet, csv_path: str | Path) -> str:
+        types = ",".join(
+            f"'{col}': '{_duckdb_type(dtype)}'" for col, dtype in sheet.columns.items()
+        )
+        nullstr = ",".join(f"'{s}'" for s in _NULL_STRINGS)
+
+        return (
+            f"read_csv('{csv_path}', header=true, nullstr=[{nullstr}], types={{{types}}})"
+        )
+
+    @staticmethod
+    def select_expressions(sheet: Sheet, source: str) -> "SheetQuery":
+        expressions = ",".join(
+            f"({expr}) AS {SheetQuery._parse_column(col)}"
+            for col, expr in sheet.expressions.items()
+        )
+
+        return SheetQuery(f"SELECT *, {expressions} FROM {source}")
+
+    @staticmethod
+    def select_fields(
+        sheet: Sheet,
+        source: str,
+        *,
+        apply_expressions: bool = True,
+        sql_scaler: list[SQLScaler] | None = None,
+    ) -> "SheetQuery":
+        if sql_scaler is None:
+            sql_scaler = sheet.sql_scaler
+
+        values = []
+
+        for col in sheet.table_fields:
+            parsed_column = SheetQuery._parse_column(col)
+            value = parsed_column
+
+            if apply_expressions and col in sheet.expressions:
+                value = f"({sheet.expressions[col]})"
+
+            for scaler in sql_scaler:
+                if col in scaler.transform_columns:
+                    value = scaler.expression(col, value)
+
+            if value == parsed_column:
+                values.append(value)
+            else:
+                values.append(f"{value} AS {parsed_column}")
+
+        return SheetQuery(f"SELECT {','.join(values)} FROM {source}")
+
+    @staticmethod
+    def insert_select(
+        sheet: Sheet,
+        source: str,
+        table_name: str | None = None,
+        *,
+        apply_expressions: bool = True,
+        sql_scaler: list[SQLScaler] | None = None,
+    ) -> "SheetQuery":
+        fields = ",".join(SheetQuery._parse_column(col) for col in sheet.table_fields)
+        select_query = SheetQuery.select_fields(
+            sheet,
+            source,
+            apply_expressions=apply_expressions,
+            sql_scaler=sql_scaler,
+        )
+
+        insert_query = (
+            f"INSERT INTO {table_name or sheet.table_name} ({fields}) "
+            f"{' '.join(select_query.query)}"
+        )
+
+        return SheetQuery(insert_query)
+
+    @staticmethod
+    def aggregate(
+        query: "SheetQuery",
+        aggregates: list[str],
+        condition: str | None = None,
+    ) -> "SheetQuery":
+        aggregate_query = SheetQuery(
+            f"SELECT {','.join(aggregates)} FROM ({' '.join(query.query)})",
+            query.params.copy(),
+        )
+
+        if condition is not None:
+            aggregate_query.where(condition)
+
+        return aggregate_query
+
+    @staticmethod
+    def feature_aggregate(
+        table_name: str,
+        key_column: str,
+        expressions: dict[str, str],
+        anchors: dict[str, tuple[str, str]] | None = None,
+    ) -> "SheetQuery":
+        key = SheetQuery._parse_column(key_column)
+        columns = ",".join(f"{expr} AS {name}" for name, expr in expressions.items())
+        joins = "".join(
+            f" LEFT JOIN (SELECT {key}, "
+            f"min(CAST({SheetQuery._parse_column(column)} AS TIMESTAMP)) AS {alias} "
+            f"FROM {anchor_table} GROUP BY {key}) USING ({key})"
+            for alias, (anchor_table, column) in (anchors or {}).items()
+        )
+        aggregate_query = (
+            f"SELECT {key}, {columns} FROM {table_name}{joins} "
+            f"WHERE {key} IS NOT NULL GROUP BY {key}"
+        )
+
+        return SheetQuery(aggregate_query)
+
+    @staticmethod
+    def create_feature_table(
+        table_name: str,
+        key_column: str,
+        queries: list["SheetQuery"],
+        columns: dict[str, str],
+    ) -> "SheetQuery":
+        key = SheetQuery._parse_column(key_column)
+        keys = " UNION ".join(f"SELECT {key} FROM ({' '.join(q.query)})" for q in queries)
+        joins = " ".join(
+            f"LEFT JOIN ({' '.join(q.query)}) AS f{i} USING ({key})"
+            for i, q in enumerate(queries)
+        )
+        select = ",".join(f"{expr} AS {name}" for name, expr in columns.items())
+        create_query = (
+            f"CREATE OR REPLACE TABLE {table_name} AS "
+            f"SELECT {key}, {select} FROM ({keys}) AS keys {joins} ORDER BY {key}"
+        )
+
+        return SheetQuery(create_query)
+
+    @staticmethod
+    def events(
+        query: "SheetQuery",
+        key_column: str,
+        time_column: str,
+        value_column: str,
+        item_column: str,
+    ) -> "SheetQuery":
+        key = SheetQuery._parse_column(key_column)
+        time = SheetQuery._parse_column(time_column)
+        events_query = (
+            f"SELECT CAST({key} AS BIGINT) AS key, "
+            f"epoch(CAST({time} AS TIMESTAMP)) AS time, "
+            f"CAST({SheetQuery._parse_column(value_column)} AS DOUBLE) AS value, "
+            f"coalesce(CAST({SheetQuery._parse_column(item_column)} AS BIGINT), -1) "
+            f"AS item FROM ({' '.join(query.query)}) WHERE {key} IS NOT NULL "
+            f"ORDER BY {key}, {time}"
+        )
+
+        return SheetQuery(events_query, query.params.copy())
+
+    @staticmethod
+    def copy_to(
+        query: "SheetQuery",
+        path: str | Path,
+        file_format: CacheFormat = "csv",
+    ) -> "SheetQuery":
+        options = "FORMAT CSV, HEADER TRUE"
+
+        if file_format == "parquet":
+            options = "FORMAT PARQUET, COMPRESSION ZSTD"
+
+        copy_query = f"COPY ({' '.join(query.query)}) TO '{path}' ({options})"
+
+        return SheetQuery(copy_query)
+
     @staticmethod
     def empty() -> "SheetQuery":
         return SheetQuery([])
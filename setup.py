@@ -3,6 +3,6 @@ from setuptools import find_packages, setup
 setup(
     name="mimic",
     version="1.2.0",
-    packages=find_packages(),
+    packages=find_packages(include=["mimic", "mimic.*"]),
     install_requires=[],
 )
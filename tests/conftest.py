@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from mimic.datasets import IV
+from mimic.utils.db import DuckDB
+from mimic.utils.sheet import Sheet, SheetJoinCondition
+
+
+@pytest.fixture
+def iv(tmp_path: Path) -> IV:
+    db = DuckDB(tmp_path, "test.db")
+    admissions = Sheet(
+        tmp_path,
+        db,
+        "admissions",
+        "admissions.csv",
+        {"hadm_id": "int64", "subject_id": "int64", "x": "float"},
+        "hadm_id",
+    )
+    patients = Sheet(
+        tmp_path,
+        db,
+        "patients",
+        "patients.csv",
+        {"subject_id": "int64", "y": "float"},
+        "subject_id",
+    )
+    db.conn.execute(
+        "INSERT INTO admissions "
+        "SELECT i + 20000000, i + 10000000, i * 0.5 FROM range(10) t(i)"
+    )
+    db.conn.execute("INSERT INTO patients SELECT i + 10000000, i FROM range(10) t(i)")
+
+    return IV(
+        tmp_path,
+        db,
+        "hadm_id",
+        ["hadm_id", "x", "y"],
+        {"admissions": admissions, "patients": patients},
+        [SheetJoinCondition(admissions, patients, ("subject_id", "subject_id"), "left")],
+        skip_load=True,
+    )
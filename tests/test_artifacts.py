@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from mimic.utils import artifacts
+from mimic.utils.artifacts import ArtifactStore
+
+
+def _file(path: Path, size: int) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def test_eviction_skips_entries_still_linked_from_dataset_roots(tmp_path: Path) -> None:
+    store = ArtifactStore(tmp_path / "store")
+
+    store.put("linked", None, _file(tmp_path / "root" / "linked.csv", 100))
+    store.put("orphan", None, _file(tmp_path / "root" / "orphan.csv", 100))
+    (tmp_path / "root" / "orphan.csv").unlink()
+
+    assert store.evict() == 100
+    assert store.evict(0) == 0
+    assert store.get("linked") is not None
+    assert store.get("orphan") is None
+
+
+def test_eviction_removes_least_recently_used_first(tmp_path: Path) -> None:
+    store = ArtifactStore(tmp_path / "store")
+
+    for name in ("a", "b", "c"):
+        store.put(name, None, _file(tmp_path / "src" / name, 100))
+        os.utime(store._entry(store.key(name)), (0, {"a": 1, "b": 3, "c": 2}[name]))
+        (tmp_path / "src" / name).unlink()
+
+    assert store.evict(200) == 200
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    assert store.get("c") is not None
+
+
+@pytest.mark.parametrize(("max_bytes", "symlink"), [(None, True), (10**9, False)])
+def test_bounded_store_copies_instead_of_symlinking(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    max_bytes: int | None,
+    *,
+    symlink: bool,
+) -> None:
+    def no_link(*_: object) -> None:
+        raise OSError
+
+    monkeypatch.setattr(artifacts.os, "link", no_link)
+    monkeypatch.setattr(artifacts, "_reflink", lambda *_: False)
+
+    store = ArtifactStore(tmp_path / "store", max_bytes)
+    source = _file(tmp_path / "src" / "a.csv", 100)
+    store.put("a", None, source)
+
+    destination = tmp_path / "root" / "a.csv"
+
+    assert store.link("a", None, destination)
+    assert destination.is_symlink() is symlink
+    assert destination.read_bytes() == source.read_bytes()
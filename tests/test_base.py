@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from torch.utils.data import DataLoader
+
+from mimic.datasets import IV
+from mimic.datasets.base import to_tensor
+from mimic.utils.db import DuckDB
+from mimic.utils.sheet import SheetQuery
+
+
+def test_workers_share_the_read_write_database_of_the_parent(iv: IV) -> None:
+    loader = DataLoader(
+        iv,
+        batch_size=3,
+        num_workers=2,
+        collate_fn=iv.collate_fn,
+        worker_init_fn=iv.worker_init_fn,
+        multiprocessing_context="fork",
+    )
+
+    rows = np.concatenate([batch.numpy() for batch in loader])
+
+    assert not iv.db.read_only
+    assert sorted(rows[:, 0].tolist()) == [20000000 + i for i in range(10)]
+
+
+def _arrays(tmp_path: Path, query: str) -> dict[str, np.ndarray]:
+    return DuckDB(tmp_path, "test.db").fetch_numpy(SheetQuery(query))
+
+
+def test_null_values_become_nan(tmp_path: Path) -> None:
+    arrays = _arrays(tmp_path, "SELECT * FROM (VALUES (1, 0.5), (NULL, NULL)) t(a, b)")
+
+    tensors = to_tensor(arrays, as_dict=True)
+
+    assert isinstance(tensors, dict)
+    np.testing.assert_array_equal(np.asarray(tensors["a"]), [1.0, np.nan])
+    np.testing.assert_array_equal(np.asarray(tensors["b"]), [0.5, np.nan])
+
+
+def test_columns_without_nulls_keep_their_dtype(tmp_path: Path) -> None:
+    arrays = _arrays(
+        tmp_path, "SELECT * FROM (VALUES (1, 0.5, true), (2, 1.5, false)) t(a, b, c)"
+    )
+
+    tensors = to_tensor(arrays, as_dict=True)
+    stacked = np.asarray(to_tensor(arrays))
+
+    assert isinstance(tensors, dict)
+    assert [np.asarray(t).dtype for t in tensors.values()] == [
+        np.int32,
+        np.float64,
+        np.bool_,
+    ]
+    assert stacked.dtype == np.float64
+    np.testing.assert_array_equal(stacked, [[1.0, 0.5, 1.0], [2.0, 1.5, 0.0]])
+
+
+def test_non_numeric_columns_are_rejected(tmp_path: Path) -> None:
+    arrays = _arrays(tmp_path, "SELECT 1 AS a, 'x' AS b")
+
+    with pytest.raises(TypeError, match="'b' is not numeric"):
+        to_tensor(arrays)
+
+
+def _rows(batch: object) -> list[list[float]]:
+    return sorted(np.asarray(batch).tolist())
+
+
+@pytest.mark.parametrize("idx", [[2, 3, 4], [7, 0, 5]])
+def test_materialized_batches_match_the_joined_query(iv: IV, idx: list[int]) -> None:
+    expected = _rows(iv.collate_fn(idx))
+
+    iv._materialize()
+
+    assert iv.batch_table is not None
+    assert iv.db.fetch_one(SheetQuery(f"SELECT COUNT(*) FROM {iv.batch_table}")) == (10,)
+    assert _rows(iv.collate_fn(idx)) == expected
+    assert len(expected) == len(idx)
+    assert len(iv) == 10
+
+
+def test_len_is_cached_until_a_write_or_a_new_filter(
+    iv: IV, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queries: list[str] = []
+    fetch_one = iv.db.fetch_one
+
+    def counting_fetch_one(query: SheetQuery) -> tuple | None:
+        queries.append(query.parse())
+        return fetch_one(query)
+
+    monkeypatch.setattr(iv.db, "fetch_one", counting_fetch_one)
+
+    assert [len(iv), len(iv)] == [10, 10]
+    assert len(queries) == 1
+
+    iv.db.exec(SheetQuery("INSERT INTO admissions VALUES (30000000, 10000000, 9.0)"))
+
+    assert [len(iv), len(iv)] == [11, 11]
+    assert len(queries) == 2
+
+    iv.count_query.where("x > 2", inplace=True)
+
+    assert [len(iv), len(iv)] == [6, 6]
+    assert len(queries) == 3
@@ -0,0 +1,69 @@
+import multiprocessing as mp
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from mimic.utils.cache import ImageCache
+
+N_KEYS = 40
+N_WORKERS = 2
+
+_cache: ImageCache | None = None
+
+
+def _image(key: int) -> np.ndarray:
+    return np.full((4, 5), key, dtype=np.uint8)
+
+
+def _load(keys: list[int]) -> int:
+    hits = 0
+
+    for key in keys:
+        array = _cache.get(str(key))
+
+        if array is None:
+            _cache.put(str(key), _image(key))
+        else:
+            assert np.array_equal(array, _image(key))
+            hits += 1
+
+    return hits
+
+
+def _epoch(keys: list[int]) -> int:
+    chunks = [keys[i::N_WORKERS] for i in range(N_WORKERS)]
+
+    with mp.get_context("fork").Pool(N_WORKERS) as pool:
+        return sum(pool.map(_load, chunks))
+
+
+def _stored(root: Path) -> int:
+    return sum(len(p.read_text().splitlines()) for p in root.glob("*.idx"))
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ImageCache:
+    global _cache  # noqa: PLW0603
+    _cache = ImageCache(tmp_path, "fingerprint", refresh_interval=0)
+    return _cache
+
+
+def test_second_epoch_hits_entries_cached_by_forked_workers(cache: ImageCache) -> None:
+    keys = list(range(N_KEYS))
+
+    assert _epoch(keys) == 0
+    assert _epoch(list(reversed(keys))) == N_KEYS
+    assert _stored(cache.root) == N_KEYS
+
+
+def test_persistent_worker_sees_entries_of_other_workers(cache: ImageCache) -> None:
+    other = ImageCache(cache.root.parent, "fingerprint", refresh_interval=0)
+    other.put("a", _image(1))
+
+    assert cache.get("a") is not None
+
+    cache.put("a", _image(2))
+
+    assert np.array_equal(cache.get("a"), _image(1))
+    assert _stored(cache.root) == 1
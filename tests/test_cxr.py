@@ -0,0 +1,78 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from benchmarks.generate import CXR_LABELS, generate_cxr
+from benchmarks.runner import CREDENTIALS
+from benchmarks.server import serve
+from mimic.datasets import CXR, CXRShards
+from mimic.utils.db import DuckDB
+from mimic.utils.sheet import SheetQuery
+
+LABELS = CXR_LABELS[:2]
+
+
+def _to_tensor(image: object) -> torch.Tensor:
+    return torch.from_numpy(np.asarray(image))
+
+
+@pytest.fixture
+def cxr(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[CXR]:
+    generate_cxr(tmp_path / "src", n_subjects=20, image_size=32, pool_size=2)
+
+    with serve(tmp_path / "src", CREDENTIALS) as url:
+        monkeypatch.setenv("CXR_URL", f"{url}/cxr")
+        monkeypatch.setenv("USERNAME", CREDENTIALS["username"])
+        monkeypatch.setenv("PASSWORD", CREDENTIALS["password"])
+
+        root = tmp_path / "root"
+        yield CXR(
+            root,
+            DuckDB(CXR.get_raw_folder(root), "test.db"),
+            list(LABELS),
+            dict.fromkeys(LABELS, 0.5),
+            transform=_to_tensor,
+            download=True,
+        )
+
+
+def _index(path: Path) -> dict:
+    return json.loads((path / "index.json").read_text())
+
+
+def test_export_shards_is_reused_until_the_selection_changes(cxr: CXR) -> None:
+    first = cxr.export_shards(samples_per_shard=8, workers=2)
+
+    assert cxr.export_shards(samples_per_shard=8, workers=2) == first
+
+    cxr.seed = 1
+    cxr._download_images()
+    second = cxr.export_shards(samples_per_shard=8, workers=2)
+
+    assert second != first
+    assert _index(second)["count"] == len(cxr)
+
+
+def test_export_shards_rewrites_a_stale_output_dir(cxr: CXR, tmp_path: Path) -> None:
+    output_dir = tmp_path / "shards"
+    before = _index(cxr.export_shards(output_dir, samples_per_shard=4, workers=2))
+
+    cxr.db.exec(SheetQuery(f'UPDATE study SET "{LABELS[0]}" = 1.0'))
+    cxr.db.exec(
+        SheetQuery(
+            "UPDATE split SET download = false "
+            "WHERE dicom_id IN (SELECT dicom_id FROM split WHERE download LIMIT 3)"
+        )
+    )
+    after = _index(cxr.export_shards(output_dir, samples_per_shard=4, workers=2))
+
+    assert after["digest"] != before["digest"]
+    assert after["count"] == len(cxr) < before["count"]
+    assert sorted(p.name for p in output_dir.glob("*.tar")) == sorted(
+        shard["name"] for shard in after["shards"]
+    )
+    assert all(labels[LABELS[0]] == 1.0 for _, labels in CXRShards(output_dir, _to_tensor))
@@ -0,0 +1,70 @@
+import datetime as dt
+import math
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from mimic.utils.db import DuckDB
+from mimic.utils.sheet import SheetQuery
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> DuckDB:
+    return DuckDB(tmp_path, "test.db")
+
+
+def _one(db: DuckDB, query: str, **params: object) -> object:
+    return db.fetch_one(SheetQuery(query, params))[0]
+
+
+def test_list_params_are_bound_not_prepared(db: DuckDB) -> None:
+    query = "SELECT count(*) FROM range(100) t(i) WHERE i IN (SELECT unnest($ids))"
+
+    assert _one(db, query, ids=[1, 2, 3]) == 3
+    assert _one(db, query, ids=list(range(50))) == 50
+    assert db.statement_cache_info()["size"] == 0
+
+
+def test_non_finite_float_params(db: DuckDB) -> None:
+    assert _one(db, "SELECT isnan($x)", x=float("nan")) is True
+    assert _one(db, "SELECT $x", x=np.float64("inf")) == math.inf
+    assert _one(db, "SELECT $x", x=0.1) == 0.1
+
+
+def test_datetime_and_decimal_params(db: DuckDB) -> None:
+    value = dt.datetime.fromisoformat("2020-01-02T03:04:05.000678")
+
+    assert _one(db, "SELECT $t", t=value) == value
+    assert _one(db, "SELECT $d", d=Decimal("1.25")) == Decimal("1.25")
+
+
+def test_statement_cache_is_keyed_on_param_types(db: DuckDB) -> None:
+    assert _one(db, "SELECT $v", v=1) == 1
+    assert _one(db, "SELECT $v", v="a") == "a"
+    assert _one(db, "SELECT $v", v=2) == 2
+
+    info = db.statement_cache_info()
+
+    assert (info["hits"], info["misses"], info["size"]) == (1, 2, 2)
+
+
+def test_reopen_closes_the_cursors_of_other_threads(tmp_path: Path) -> None:
+    db = DuckDB(tmp_path, "test.db")
+    db.conn.execute("CREATE TABLE t AS SELECT 1 AS x")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cursors = list(executor.map(lambda _: db.conn, range(2)))
+        assert len(db._cursors) == len(set(map(id, cursors))) > 0
+
+        db.reopen(read_only=True)
+
+        assert db._cursors == []
+        assert list(
+            executor.map(lambda _: db.conn.execute("FROM t").fetchall(), range(2))
+        ) == [
+            [(1,)],
+            [(1,)],
+        ]
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+
+import pytest
+import requests
+
+from benchmarks.runner import CREDENTIALS
+from benchmarks.server import serve
+from mimic.utils import download, download_and_extract_archives
+
+
+def test_download_urls_reports_failed_urls_with_the_cause(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    def download_file(
+        _session: requests.Session, url: str, path: Path, **_: object
+    ) -> None:
+        if url.endswith("bad.jpg"):
+            raise requests.exceptions.HTTPError(url)
+
+        path.write_bytes(b"ok")
+
+    monkeypatch.delenv("MIMIC_ARTIFACT_ROOT", raising=False)
+    monkeypatch.setattr(download, "download_file", download_file)
+    urls = ["https://host/good.jpg", "https://host/a/bad.jpg", "https://host/b/bad.jpg"]
+    files = [(url, tmp_path / f"{i}.jpg") for i, url in enumerate(urls)]
+
+    with caplog.at_level(logging.WARNING), pytest.raises(RuntimeError) as info:
+        download.download_urls(files, CREDENTIALS, max_workers=2)
+
+    assert "2 of 3 downloads failed" in str(info.value)
+    assert all(url in str(info.value) for url in urls[1:])
+    assert urls[0] not in str(info.value)
+    assert isinstance(info.value.__cause__, requests.exceptions.HTTPError)
+    assert sum("Failed to download" in r.message for r in caplog.records) == 2
+    assert (tmp_path / "0.jpg").exists()
+
+
+def _archives(root: Path) -> dict[str, tuple[bytes, str]]:
+    archives = {}
+
+    for name in ("admissions", "patients"):
+        data = f"{name}_id,x\n1,2\n3,4\n".encode()
+        blob = gzip.compress(data)
+        (root / f"{name}.csv.gz").write_bytes(blob)
+        archives[name] = (data, hashlib.md5(blob, usedforsecurity=False).hexdigest())
+
+    return archives
+
+
+def test_archives_are_downloaded_concurrently_and_streamed_through_gunzip(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "src").mkdir()
+    archives = _archives(tmp_path / "src")
+    monkeypatch.delenv("MIMIC_ARTIFACT_ROOT", raising=False)
+
+    with serve(tmp_path / "src", CREDENTIALS) as url:
+        resources = [
+            {"url": f"{url}/{name}.csv.gz", "md5": md5, "download_root": tmp_path / "dst"}
+            for name, (_, md5) in archives.items()
+        ]
+        resources.append(
+            {
+                "url": f"{url}/patients.csv.gz",
+                "md5": "0" * 32,
+                "download_root": tmp_path / "bad",
+            }
+        )
+
+        with pytest.raises(RuntimeError, match="1 of 3 downloads failed") as info:
+            download_and_extract_archives(resources, CREDENTIALS, max_workers=3)
+
+    assert info.value.__cause__ is not None
+    assert sorted(p.name for p in (tmp_path / "dst").iterdir()) == [
+        "admissions.csv",
+        "admissions.csv.gz",
+        "patients.csv",
+        "patients.csv.gz",
+    ]
+    assert list((tmp_path / "bad").iterdir()) == []
+
+    for name, (data, _) in archives.items():
+        assert (tmp_path / "dst" / f"{name}.csv").read_bytes() == data
+
+    (tmp_path / "dst" / "patients.csv").unlink()
+    download_and_extract_archives(resources[:2], CREDENTIALS)
+
+    assert (tmp_path / "dst" / "patients.csv").read_bytes() == archives["patients"][0]
+
+
+def test_archives_are_kept_compressed_without_extract(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "src").mkdir()
+    archives = _archives(tmp_path / "src")
+    monkeypatch.delenv("MIMIC_ARTIFACT_ROOT", raising=False)
+
+    with serve(tmp_path / "src", CREDENTIALS) as url:
+        download_and_extract_archives(
+            [
+                {"url": f"{url}/{name}.csv.gz", "md5": md5, "download_root": tmp_path}
+                for name, (_, md5) in archives.items()
+            ],
+            CREDENTIALS,
+            extract=False,
+        )
+
+    assert sorted(p.name for p in tmp_path.glob("*.csv*")) == [
+        "admissions.csv.gz",
+        "patients.csv.gz",
+    ]
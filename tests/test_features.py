@@ -0,0 +1,128 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from mimic.utils.db import DuckDB
+from mimic.utils.features import Feature, FeatureSheet
+from mimic.utils.sheet import Sheet
+
+
+def _sheet(
+    root: Path, db: DuckDB, table_name: str, frame: pd.DataFrame, **columns: str
+) -> Sheet:
+    frame.to_csv(root / f"{table_name}.csv", index=False)
+    sheet = Sheet(
+        root,
+        db,
+        table_name,
+        f"{table_name}.csv",
+        dict.fromkeys(frame.columns, "string") | {"hadm_id": "int64"} | columns,
+        "hadm_id",
+    )
+    sheet.load_csv()
+
+    return sheet
+
+
+def test_windowed_features_only_aggregate_events_relative_to_admission(
+    tmp_path: Path,
+) -> None:
+    db = DuckDB(tmp_path, "test.db")
+    admissions = _sheet(
+        tmp_path,
+        db,
+        "admissions",
+        pd.DataFrame(
+            {
+                "hadm_id": [1, 2],
+                "admittime": ["2150-01-01 08:00:00", "2150-03-01 00:00:00"],
+            }
+        ),
+    )
+    labevents = _sheet(
+        tmp_path,
+        db,
+        "labevents",
+        pd.DataFrame(
+            {
+                "hadm_id": [1, 1, 1, 1, 2],
+                "charttime": [
+                    "2150-01-01 07:00:00",
+                    "2150-01-01 09:00:00",
+                    "2150-01-02 07:59:00",
+                    "2150-01-02 08:00:00",
+                    "2150-03-05 00:00:00",
+                ],
+                "valuenum": [9.0, 1.0, 2.0, 7.0, 5.0],
+            }
+        ),
+        valuenum="float",
+    )
+    window = {
+        "time_column": "charttime",
+        "anchor": admissions,
+        "anchor_column": "admittime",
+    }
+
+    features = FeatureSheet(
+        tmp_path,
+        db,
+        "admission_features",
+        [
+            Feature("lab_max", labevents, "valuenum", "max"),
+            Feature(
+                "lab_max_24h",
+                labevents,
+                "valuenum",
+                "max",
+                window=("0 hours", "24 hours"),
+                **window,
+            ),
+            Feature(
+                "lab_count_24h",
+                labevents,
+                "valuenum",
+                "count",
+                condition="valuenum > 1.5",
+                window=("0 hours", "24 hours"),
+                **window,
+            ),
+            Feature(
+                "lab_first_pre",
+                labevents,
+                "valuenum",
+                "first",
+                window=("-12 hours", "0 hours"),
+                **window,
+            ),
+        ],
+    )
+    features.load_csv()
+
+    table = db.conn.execute(
+        "SELECT hadm_id, lab_max, lab_max_24h, lab_count_24h, lab_first_pre "
+        "FROM admission_features ORDER BY hadm_id"
+    ).fetchall()
+
+    assert [tuple(map(str, row)) for row in table] == [
+        ("1", "9.0", "2.0", "1", "9.0"),
+        ("2", "5.0", "None", "0", "None"),
+    ]
+    assert admissions in features.dependencies
+
+
+def test_a_window_needs_an_anchor(tmp_path: Path) -> None:
+    sheet = Sheet(
+        tmp_path, DuckDB(tmp_path, "test.db"), "t", "t.csv", {"hadm_id": "int64"}, "hadm_id"
+    )
+
+    with pytest.raises(ValueError, match="anchor"):
+        Feature(
+            "x",
+            sheet,
+            "valuenum",
+            "max",
+            time_column="charttime",
+            window=("0 hours", "1 day"),
+        )
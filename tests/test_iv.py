@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from mimic.datasets import IV, IVStream
+from mimic.datasets import iv as iv_module
+
+
+def _stream(iv: IV, **kwargs: int) -> IVStream:
+    return IVStream(
+        iv.root,
+        iv.db,
+        iv.column_id,
+        iv.columns,
+        iv.sheets,
+        iv.join_conditions,
+        skip_load=True,
+        **kwargs,
+    )
+
+
+def _ids(batches: list[np.ndarray]) -> list[int]:
+    return [int(row[0]) for batch in batches for row in np.asarray(batch)]
+
+
+@pytest.mark.parametrize(("num_workers", "expected"), [(0, 3), (2, 4), (3, 3)])
+def test_len_counts_batches_per_worker_shard(
+    iv: IV, num_workers: int, expected: int
+) -> None:
+    stream = _stream(iv, batch_size=4, num_workers=num_workers)
+
+    assert len(iv) == 10
+    assert len(stream) == expected
+
+
+def test_worker_shards_split_rows_without_overlap(
+    iv: IV, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stream = _stream(iv, batch_size=4, num_workers=3, rows_per_batch=2)
+    shards = []
+
+    for shard in range(3):
+        monkeypatch.setattr(iv_module, "worker_shard", lambda shard=shard: (shard, 3))
+        shards.append(list(stream))
+
+    assert sum(len(batches) for batches in shards) == len(stream)
+    assert [len(_ids(batches)) for batches in shards] == [3, 3, 4]
+    assert sorted(_ids([b for batches in shards for b in batches])) == [
+        20000000 + i for i in range(10)
+    ]
+
+
+def test_shuffle_buffer_reorders_rows_per_epoch(iv: IV) -> None:
+    stream = _stream(iv, batch_size=3, shuffle_buffer=10, rows_per_batch=4)
+
+    first = _ids(list(stream))
+    again = _ids(list(stream))
+    stream.set_epoch(1)
+    second = _ids(list(stream))
+
+    assert first == again
+    assert first != second
+    assert sorted(first) == sorted(second) == [20000000 + i for i in range(10)]
+    assert first != sorted(first)
+    assert [len(batch) for batch in stream] == [3, 3, 3, 1]
@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from mimic.utils.db import DuckDB
+from mimic.utils.manifest import ImageManifest
+
+
+def _corrupt(path: Path) -> None:
+    stat = path.stat()
+    path.write_bytes(b"x" * stat.st_size)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_check_hashes_only_changed_entries_and_verify_hashes_all(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    files = [f"p10/s{i}.jpg" for i in range(3)]
+    (tmp_path / "p10").mkdir()
+
+    for i, file in enumerate(files):
+        (tmp_path / file).write_bytes(bytes([i]) * 64)
+
+    manifest = ImageManifest(DuckDB(tmp_path, "test.db"), tmp_path, max_workers=2)
+    hashed: list[str] = []
+    md5 = manifest._md5
+    monkeypatch.setattr(manifest, "_md5", lambda file: hashed.append(file) or md5(file))
+
+    assert manifest.check(files)
+    assert hashed == []
+
+    assert manifest.check(files, verify=True)
+    assert sorted(hashed) == files
+    assert all(entry[2] is not None for entry in manifest._entries().values())
+
+    hashed.clear()
+    os.utime(tmp_path / files[0], ns=(0, 0))
+
+    assert manifest.check(files, verify=True)
+    assert hashed == [files[0]]
+
+    (tmp_path / files[2]).write_bytes(b"y" * 32)
+
+    assert not manifest.check(files, verify=True)
+    (tmp_path / files[2]).write_bytes(bytes([2]) * 64)
+
+    _corrupt(tmp_path / files[1])
+
+    assert manifest.check(files, verify=True)
+    assert not manifest.verify(files)
+
+
+def test_a_missing_file_fails_the_check(tmp_path: Path) -> None:
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    manifest = ImageManifest(DuckDB(tmp_path, "test.db"), tmp_path)
+
+    assert manifest.check(["a.jpg"], verify=True)
+    assert not manifest.check(["a.jpg", "b.jpg"], verify=True)
@@ -0,0 +1,47 @@
+import multiprocessing as mp
+from pathlib import Path
+
+from mimic.utils.metrics import Metrics
+
+
+def _worker(metrics: Metrics, n: int) -> None:
+    metrics.attach_worker()
+
+    for _ in range(n):
+        with metrics.timer("cxr.transform"):
+            pass
+
+    metrics.count("cxr.rows", n)
+
+
+def test_worker_metrics_are_saved_on_exit_and_merged(tmp_path: Path) -> None:
+    metrics = Metrics(worker_dir=tmp_path / "workers")
+    metrics.count("cxr.rows", 1)
+
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=_worker, args=(metrics, n)) for n in (2, 3)]
+
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    assert metrics.merge_workers() == 2
+    assert not list((tmp_path / "workers").iterdir())
+
+    summary = metrics.summary()
+
+    assert summary["timers"]["cxr.transform"]["count"] == 5
+    assert summary["counters"]["cxr.rows"] == 6
+    assert {event["pid"] for event in metrics.events} == {w.pid for w in workers}
+
+
+def test_attach_worker_is_a_no_op_without_worker_dir() -> None:
+    metrics = Metrics()
+    metrics.count("rows")
+    metrics.attach_worker()
+
+    assert metrics.counters == {"rows": 1}
+    assert metrics.merge_workers() == 0
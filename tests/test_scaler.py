@@ -0,0 +1,159 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mimic.utils.db import DuckDB
+from mimic.utils.scaler import (
+    DBStandardScaler,
+    SQLMinMaxScaler,
+    SQLScaler,
+    SQLStandardScaler,
+)
+from mimic.utils.sheet import Sheet
+
+
+def _load(root: Path, db: DuckDB, chunk_size: int | None) -> DBStandardScaler:
+    scaler = DBStandardScaler(["x"])
+    sheet = Sheet(
+        root,
+        db,
+        "labevents",
+        "labevents.csv",
+        {"hadm_id": "int64", "x": "float"},
+        "hadm_id",
+        scaler=[scaler],
+        chunk_size=chunk_size,
+        force_insert=True,
+    )
+    sheet.load_csv()
+
+    return scaler
+
+
+@pytest.mark.parametrize("chunk_size", [None, 7])
+def test_reloading_a_sheet_refits_the_scaler_from_scratch(
+    tmp_path: Path, chunk_size: int | None
+) -> None:
+    x = np.random.default_rng(0).normal(5.0, 2.0, 50)
+    pd.DataFrame({"hadm_id": range(50), "x": x}).to_csv(
+        tmp_path / "labevents.csv", index=False
+    )
+    db = DuckDB(tmp_path, "test.db")
+
+    first = _load(tmp_path, db, chunk_size).scaler
+    second = _load(tmp_path, db, chunk_size).scaler
+
+    assert second.n_samples_seen_ == first.n_samples_seen_ == 50
+    np.testing.assert_allclose(second.mean_, [x.mean()])
+    np.testing.assert_allclose(second.var_, first.var_)
+    np.testing.assert_allclose(second.var_, [x.var()])
+
+
+def _sql_sheet(
+    root: Path,
+    db: DuckDB,
+    sql_scaler: list[SQLScaler],
+    *,
+    train: bool = True,
+) -> list[float]:
+    sheet = Sheet(
+        root,
+        db,
+        "chartevents",
+        "chartevents.csv",
+        {"hadm_id": "int64", "split": "string", "x": "float"},
+        "hadm_id",
+        sql_scaler=sql_scaler,
+        train=train,
+    )
+    sheet.load_csv()
+
+    rows = db.conn.execute("SELECT x FROM chartevents ORDER BY hadm_id").fetchall()
+
+    return [x for (x,) in rows]
+
+
+def _write(root: Path, x: list[float], split: list[str] | None = None) -> None:
+    pd.DataFrame(
+        {
+            "hadm_id": range(len(x)),
+            "split": split or ["train"] * len(x),
+            "x": x,
+        }
+    ).to_csv(root / "chartevents.csv", index=False)
+
+
+def test_sql_scalers_fit_inside_duckdb(tmp_path: Path) -> None:
+    x = [1.0, 2.0, 3.0, 6.0]
+    _write(tmp_path, x)
+    db = DuckDB(tmp_path, "test.db")
+
+    standard = SQLStandardScaler(["x"])
+    values = _sql_sheet(tmp_path, db, [standard])
+
+    np.testing.assert_allclose(standard.params["x"], [np.mean(x), np.std(x)])
+    np.testing.assert_allclose(values, (np.array(x) - np.mean(x)) / np.std(x))
+
+
+def test_sql_scaler_condition_selects_the_rows_to_fit_on(tmp_path: Path) -> None:
+    _write(tmp_path, [0.0, 10.0, 100.0], ["train", "train", "test"])
+    db = DuckDB(tmp_path, "test.db")
+
+    scaler = SQLMinMaxScaler(["x"], condition="split = 'train'")
+    values = _sql_sheet(tmp_path, db, [scaler])
+
+    assert scaler.params["x"] == [0.0, 10.0]
+    np.testing.assert_allclose(values, [0.0, 1.0, 10.0])
+
+
+def test_chained_sql_scalers_fit_on_the_previous_output(tmp_path: Path) -> None:
+    _write(tmp_path, [1.0, 2.0, 3.0, 6.0])
+    db = DuckDB(tmp_path, "test.db")
+
+    minmax = SQLMinMaxScaler(["x"], feature_range=(-1.0, 1.0))
+    values = _sql_sheet(tmp_path, db, [SQLStandardScaler(["x"]), minmax])
+
+    assert minmax.params["x"][0] < 0
+    np.testing.assert_allclose([min(values), max(values)], [-1.0, 1.0])
+
+
+def test_sql_scalers_are_reloaded_without_refitting(tmp_path: Path) -> None:
+    _write(tmp_path, [0.0, 5.0, 10.0])
+    db = DuckDB(tmp_path, "test.db")
+    _sql_sheet(tmp_path, db, [SQLMinMaxScaler(["x"])])
+
+    _write(tmp_path, [20.0, 40.0])
+    scaler = SQLMinMaxScaler(["x"])
+    values = _sql_sheet(tmp_path, db, [scaler], train=False)
+
+    assert scaler.params["x"] == [0.0, 10.0]
+    np.testing.assert_allclose(values, [2.0, 4.0])
+
+
+@pytest.mark.parametrize("scaler", [SQLStandardScaler, SQLMinMaxScaler])
+def test_sql_scalers_fit_on_finite_values_only(
+    tmp_path: Path, scaler: type[SQLScaler]
+) -> None:
+    _write(tmp_path, [1.0, 3.0, np.inf])
+    db = DuckDB(tmp_path, "test.db")
+
+    values = _sql_sheet(tmp_path, db, [scaler(["x"])])
+
+    assert values[2] == np.inf
+    assert sorted(values[:2]) in ([-1.0, 1.0], [0.0, 1.0])
+
+
+def test_sql_scaler_writes_non_finite_params_as_typed_literals(tmp_path: Path) -> None:
+    _write(tmp_path, [1.0, 2.0])
+    db = DuckDB(tmp_path, "test.db")
+    scaler = SQLMinMaxScaler(["x"])
+    scaler.params = {"x": [float("-inf"), float("nan")]}
+
+    root = tmp_path / "chartevents"
+    scaler.save(root)
+
+    values = _sql_sheet(tmp_path, db, [SQLMinMaxScaler(["x"])], train=False)
+
+    assert np.isnan(values).all()
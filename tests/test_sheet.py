@@ -0,0 +1,186 @@
+from pathlib import Path
+from typing import Literal
+
+import pandas as pd
+import pytest
+
+from mimic.datasets import IV
+from mimic.datasets.cxr import _IMAGE_PATH_EXPRESSION
+from mimic.utils import sheet as sheet_module
+from mimic.utils.db import DuckDB
+from mimic.utils.sheet import Sheet, SheetQuery, SheetSubset
+
+
+def test_get_by_id_casts_string_ids_to_bigint_column(iv: IV) -> None:
+    assert iv._column_type("hadm_id") == "BIGINT"
+
+    df = iv.get_by_id(["20000003", "20000007"]).sort_values("hadm_id")
+
+    assert df["hadm_id"].tolist() == [20000003, 20000007]
+    assert df["x"].tolist() == [1.5, 3.5]
+    assert df["y"].tolist() == [3.0, 7.0]
+
+
+def test_get_by_id_accepts_a_single_string_id(iv: IV) -> None:
+    assert iv.get_by_id("20000001")["hadm_id"].tolist() == [20000001]
+
+
+def _keep(_db: DuckDB, df: pd.DataFrame) -> SheetSubset:
+    return SheetSubset(df)
+
+
+@pytest.mark.parametrize("cache_format", ["csv", "parquet"])
+def test_a_changed_source_is_not_reloaded_from_the_stale_cache(
+    tmp_path: Path, cache_format: Literal["csv", "parquet"]
+) -> None:
+    db = DuckDB(tmp_path, "test.db")
+
+    def load(rows: dict[str, list[int]]) -> list[tuple]:
+        pd.DataFrame(rows).to_csv(tmp_path / "labevents.csv", index=False)
+        sheet = Sheet(
+            tmp_path,
+            db,
+            "labevents",
+            "labevents.csv",
+            {"hadm_id": "int64", "x": "int64"},
+            "hadm_id",
+            transform=_keep,
+            cache_format=cache_format,
+            skip_unchanged=True,
+        )
+        sheet.load_csv()
+
+        return db.conn.execute("SELECT * FROM labevents ORDER BY hadm_id").fetchall()
+
+    assert load({"hadm_id": [1, 2], "x": [10, 20]}) == [(1, 10), (2, 20)]
+    assert load({"hadm_id": [3, 4, 5], "x": [30, 40, 50]}) == [(3, 30), (4, 40), (5, 50)]
+    assert load({"hadm_id": [3, 4, 5], "x": [30, 40, 50]}) == [(3, 30), (4, 40), (5, 50)]
+
+
+def test_native_load_maps_dtypes_and_null_markers_like_pandas(tmp_path: Path) -> None:
+    columns = {
+        "hadm_id": "int64",
+        "itemid": "int32",
+        "valuenum": "float",
+        "flag": "boolean",
+        "value": "string",
+    }
+    markers = [m for m in sheet_module._NULL_STRINGS if m]
+    rows = ["hadm_id,itemid,valuenum,flag,value", "1,7,0.5,true,abc"]
+    rows += [f"{i + 2},{i},{m},{m},{m}" for i, m in enumerate(markers)]
+    (tmp_path / "labevents.csv").write_text("\n".join(rows) + "\n")
+
+    db = DuckDB(tmp_path, "test.db")
+    sheet = Sheet(tmp_path, db, "labevents", "labevents.csv", columns, "hadm_id")
+    sheet.load_csv()
+
+    types = db.conn.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = 'labevents' ORDER BY ordinal_position"
+    ).fetchall()
+    table = db.conn.execute("SELECT * FROM labevents ORDER BY hadm_id").df()
+    expected = pd.read_csv(tmp_path / "labevents.csv", dtype=columns)
+
+    assert not sheet.needs_pandas
+    assert types == [
+        ("hadm_id", "BIGINT"),
+        ("itemid", "INTEGER"),
+        ("valuenum", "FLOAT"),
+        ("flag", "BOOLEAN"),
+        ("value", "VARCHAR"),
+    ]
+    assert table.isna().to_numpy().tolist() == expected.isna().to_numpy().tolist()
+    assert table.loc[0, "value"] == expected.loc[0, "value"] == "abc"
+
+
+def _transform_split(df: pd.DataFrame) -> pd.DataFrame:
+    df["image_path"] = (
+        "files/p"
+        + df["subject_id"].str[:2]
+        + "/p"
+        + df["subject_id"]
+        + "/s"
+        + df["study_id"]
+        + "/"
+        + df["dicom_id"]
+        + ".jpg"
+    )
+    df["download"] = False
+
+    return df
+
+
+def test_split_image_path_expression_matches_the_pandas_transform(tmp_path: Path) -> None:
+    split = pd.DataFrame(
+        {
+            "dicom_id": ["02aa804e-bde0afdd", "174413ec-4ec4c1f7", "2a2277a9-b0ded155"],
+            "study_id": ["50414267", "53189527", "53911762"],
+            "subject_id": ["10000032", "19999987", "10000898"],
+            "split": ["train", "validate", "test"],
+        }
+    )
+    split.to_csv(tmp_path / "split.csv", index=False)
+    columns = dict.fromkeys(split.columns, "string")
+
+    db = DuckDB(tmp_path, "test.db")
+    Sheet(
+        tmp_path,
+        db,
+        "split",
+        "split.csv",
+        columns,
+        "dicom_id",
+        table_fields=dict.fromkeys([*columns, "image_path"], "string")
+        | {"download": "boolean"},
+        expressions={"image_path": _IMAGE_PATH_EXPRESSION, "download": "false"},
+    ).load_csv()
+
+    fields = ["dicom_id", "study_id", "subject_id", "split", "image_path", "download"]
+    table = db.conn.execute(f"SELECT {','.join(fields)} FROM split ORDER BY dicom_id").df()
+    expected = _transform_split(pd.read_csv(tmp_path / "split.csv", dtype=columns))
+
+    assert table.astype(object).to_dict("records") == (
+        expected[fields].sort_values("dicom_id").astype(object).to_dict("records")
+    )
+
+
+def _sample(db: DuckDB, split: Sheet, seed: int) -> set[str]:
+    queries = {
+        label: (SheetQuery(f"SELECT dicom_id FROM split WHERE {label} IS NOT NULL"), 0.3)
+        for label in ("a", "b")
+    }
+    sample = SheetQuery.sample_by_label(queries, "dicom_id", seed=seed)
+    db.exec(SheetQuery.update_in(split, "download", "dicom_id", sample))
+
+    return {dicom_id for (dicom_id,) in db.fetch_all(sample)}
+
+
+def test_label_balanced_sample_is_seeded_and_flags_downloads(tmp_path: Path) -> None:
+    db = DuckDB(tmp_path, "test.db")
+    split = Sheet(
+        tmp_path,
+        db,
+        "split",
+        "split.csv",
+        {"dicom_id": "string", "a": "float", "b": "float", "download": "boolean"},
+        "dicom_id",
+    )
+    db.conn.execute(
+        "INSERT INTO split SELECT 'd' || i, CASE WHEN i < 20 THEN 1 END, "
+        "CASE WHEN i >= 10 THEN 1 END, NULL FROM range(40) t(i)"
+    )
+
+    first = _sample(db, split, seed=0)
+
+    assert _sample(db, split, seed=1) != first
+    assert _sample(db, split, seed=0) == first
+
+    flagged = db.fetch_all(SheetQuery("SELECT dicom_id FROM split WHERE download"))
+
+    assert len([d for d in first if int(d[1:]) < 20]) >= 6
+    assert len([d for d in first if int(d[1:]) >= 10]) >= 9
+    assert len(first) <= 6 + 9
+    assert {dicom_id for (dicom_id,) in flagged} == first
+    assert db.fetch_one(SheetQuery("SELECT count(*) FROM split WHERE NOT download")) == (
+        40 - len(first),
+    )